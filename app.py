@@ -1,38 +1,66 @@
 import asyncio
+import os
+import signal
+import time
 import uuid
 import httpx
-import json
+import codec
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Request, Depends, Header
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from tenacity import retry, stop_after_attempt, wait_exponential
-from config import load_config, AppConfig
-from critic import CriticService
-from utils import write_debug_trace, format_response, request_id_ctx
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, FastAPI, HTTPException, Request, Depends, Header
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from config import AppConfig, RetryConfig, RuntimeSettings, load_config
+from cache import ResponseCache, candidate_key, critic_key, request_key
+from generations import Generation, GenerationManager
+from health import HealthMonitor
+from recorder import CandidateRecorder
+import metrics
+from hedging import HedgeBudget, LatencyTracker, race_hedged
+from limits import AdmissionController, Overloaded
+from shared_state import SharedStore
+from resilience import BreakerRegistry, RetryBudget, RETRYABLE_STATUS, send_with_retries
+from singleflight import SingleFlight
+from spans import SpanTrace, record_span, span, start_trace
+from trace_writer import TraceWriter, build_trace
+from disconnect import ClientDisconnected, relay_until_disconnected, run_until_disconnected
+from fanout import CandidateAssembler, NoCandidates, wait_for_quorum, release_stragglers
+from utils import (
+    configure_logging, format_response, completion_to_chunks, iter_sse_json, request_id_ctx
+)
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional
 from pathlib import Path
 import logging
 from reasoning_filter import ReasoningFilter
 
-REASONING_FILTER_ENABLED = False
-
 class ChatCompletionRequest(BaseModel):
     model: Optional[str] = None
     messages: List[Dict[str, Any]]
     temperature: Optional[float] = 1.0
     stream: Optional[bool] = False
+    # Gateway-only quorum overrides, never forwarded upstream
+    min_candidates: Optional[int] = Field(None, ge=1)
+    soft_deadline: Optional[float] = Field(None, ge=0)
+    # Applies to the gateway's own stream; candidates and the critic are called without it
+    stream_options: Optional[Dict[str, Any]] = None
+
+GATEWAY_FIELDS = {"min_candidates", "soft_deadline", "stream_options"}
 
-app = FastAPI(title="Mixture-of-Models Gateway")
-DEBUG_REQUESTS_DIR: Optional[Path] = None
+router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Manage shared HTTP client"""
+    """Manage config generations and process-wide state"""
+    settings: RuntimeSettings = app.state.settings
     config = load_config()
-    app.state.config = config
+    # Rate buckets and breaker trips shared by worker processes on this host
+    app.state.store = SharedStore(config.shared_state_path) if config.shared_state_path else None
+    if settings.workers > 1 and not app.state.store:
+        logger.warning("Running %s workers without shared_state_path: limits are per worker", settings.workers)
+    # Sets app.state.config/pools/critic/limits/hedge_budgets for the current generation
+    app.state.generations = GenerationManager(app.state, config)
 
     if not config.api_key:
         logger.warning(
@@ -41,35 +69,206 @@ async def lifespan(app: FastAPI):
             "Set 'api_key' in config.yaml to enable authentication.\n"
         )
 
-    transport = httpx.AsyncHTTPTransport(retries=2)
-    app.state.http_client = httpx.AsyncClient(
-        timeout=config.timeout,
-        transport=transport
+    app.state.cache = (
+        ResponseCache(config.cache, config.shared_state_path) if config.cache.enabled else None
     )
-    app.state.critic = CriticService(config, app.state.http_client)
+    app.state.flights = SingleFlight() if config.coalesce_requests else None
+    app.state.tracer = None
+    if settings.debug_requests_dir:
+        app.state.tracer = TraceWriter(
+            Path(settings.debug_requests_dir), config.trace, settings.debug_requests_sample
+        )
+        app.state.tracer.start()
+    app.state.recorder = None
+    if config.record.path:
+        app.state.recorder = CandidateRecorder(config.record)
+        app.state.recorder.start()
+    app.state.span_writer = None
+    if config.spans.directory:
+        app.state.span_writer = TraceWriter(Path(config.spans.directory), config.trace, 1.0, prefix="spans")
+        app.state.span_writer.start()
+    app.state.admission = AdmissionController(config.admission)
+    app.state.latency = LatencyTracker()
+    app.state.breakers = BreakerRegistry(config.breaker, app.state.store)
+    app.state.retry_budget = RetryBudget(config.retry)
+
+    # Warm pools in the background; /readyz reports 503 until done
+    app.state.health = HealthMonitor(app.state.generations)
+    app.state.health.start()
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, app.state.generations.trigger)
+    except (NotImplementedError, AttributeError):  # No SIGHUP on this platform
+        pass
+    if config.reload_interval:
+        app.state.generations.watch(config.reload_interval)
+    if app.state.store:
+        # /admin/reload on any worker reaches the others through the shared store
+        app.state.generations.follow(app.state.store, config.reload_interval or 1.0)
     yield
-    await app.state.http_client.aclose()
+    await app.state.health.aclose()
+    if app.state.tracer:
+        await app.state.tracer.aclose()
+    if app.state.span_writer:
+        await app.state.span_writer.aclose()
+    if app.state.recorder:
+        await app.state.recorder.aclose()
+    await app.state.generations.aclose()
+    if app.state.cache:
+        app.state.cache.close()
+    if app.state.store:
+        app.state.store.close()
+
+class RequestIdMiddleware:
+    """Tag each request with an id; plain ASGI so endpoints still see client disconnects"""
 
-app.router.lifespan_context = lifespan
+    def __init__(self, app):
+        self.app = app
 
-@app.middleware("http")
-async def add_request_id(request: Request, call_next):
-    rid = uuid.uuid4().hex[:8]
-    request.state.id = rid
-    token = request_id_ctx.set(rid)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rid = uuid.uuid4().hex[:8]
+        scope.setdefault("state", {})["id"] = rid
+        token = request_id_ctx.set(rid)
+        try:
+            logger.info("Request started")
+            await self.app(scope, receive, send)
+        finally:
+            request_id_ctx.reset(token)
+
+async def call_endpoint(
+    client: httpx.AsyncClient,
+    endpoint,
+    payload: dict,
+    retry: Optional[RetryConfig] = None,
+    budget: Optional[RetryBudget] = None,
+    stream: bool = False
+) -> httpx.Response:
+    """Unified endpoint caller with retries on transport errors, 429 and 5xx"""
+    url = f"{endpoint.base_url.rstrip('/')}/v1/chat/completions"
+    headers = {"Authorization": f"Bearer {endpoint.api_key}", **codec.JSON_HEADERS}
+    request = client.build_request("POST", url, content=codec.dumpb(payload), headers=headers)
+    return await send_with_retries(
+        lambda: client.send(request, stream=stream),
+        retry or RetryConfig(),
+        budget,
+        label=f"{payload.get('model')}@{endpoint.name}"
+    )
+
+async def stream_endpoint(state, client: httpx.AsyncClient, endpoint, payload: dict, task_info: dict):
+    """Consume a streamed candidate, returning (status, assembled body)"""
+    started = time.monotonic()
+    assembler = CandidateAssembler()
+    resp = await call_endpoint(
+        client, endpoint, payload, state.config.retry, state.retry_budget, stream=True
+    )
     try:
-        logger.info("Request started")
-        response = await call_next(request)
-        return response
+        if resp.status_code != 200:
+            return resp.status_code, None
+        async for chunk in iter_sse_json(resp):
+            if "ttfb" not in task_info:
+                task_info["ttfb"] = time.monotonic() - started
+            assembler.add(chunk)
     finally:
-        request_id_ctx.reset(token)
+        await resp.aclose()
+    return resp.status_code, assembler.body()
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-async def call_endpoint(client: httpx.AsyncClient, endpoint, payload: dict):
-    """Unified endpoint caller with retries"""
-    url = f"{endpoint.base_url.rstrip('/')}/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {endpoint.api_key}"}
-    return await client.post(url, json=payload, headers=headers)
+async def query_model(state, endpoint, model, task_info: dict) -> Optional[dict]:
+    """Query a single base model, returning its body or None on failure"""
+    cache: Optional[ResponseCache] = state.cache
+    key = candidate_key(endpoint.name, task_info["payload"]) if cache else None
+    if cache:
+        cached = await cache.get(key)
+        if cached is not None:
+            logger.debug(f"Cache hit for model {model.model}")
+            task_info["status"] = "cached"
+            task_info["body"] = cached
+            metrics.CANDIDATES.inc(endpoint.name, model.model, "cached")
+            return cached
+
+    async def fetch(target):
+        attempt_started = time.monotonic()
+        async with state.limits.hold(target.name, model.model):
+            client = state.pools.get(target.name)
+            if task_info["payload"].get("stream"):
+                status, body = await stream_endpoint(
+                    state, client, target, task_info["payload"], task_info
+                )
+            else:
+                res = await call_endpoint(
+                    client, target, task_info["payload"], state.config.retry, state.retry_budget
+                )
+                task_info.setdefault("ttfb", time.monotonic() - started)
+                status, body = res.status_code, codec.loads(res.content) if res.status_code == 200 else None
+        if status == 200:
+            state.latency.observe(target.name, model.model, time.monotonic() - attempt_started)
+        # Client errors (4xx other than 429) say nothing about upstream health
+        if status == 200 or status in RETRYABLE_STATUS:
+            state.breakers.record(target.name, model.model, status == 200)
+        return status, body
+
+    async def fetch_hedged():
+        hedge = model.hedge
+        budget: HedgeBudget = state.hedge_budgets[(model.endpoint, model.model)]
+        budget.record_request()
+        delay = hedge.delay
+        if delay is None:
+            delay = state.latency.quantile(
+                endpoint.name, model.model, hedge.percentile, hedge.min_samples
+            )
+        # Unknown hedge endpoints are rejected when the config is validated
+        alternate = state.config.get_endpoint(hedge.endpoint) if hedge.endpoint else endpoint
+        if delay is None:
+            return await fetch(endpoint)
+        return await race_hedged(
+            lambda: fetch(endpoint),
+            lambda: fetch(alternate),
+            delay,
+            budget,
+            label=f"{model.model}@{alternate.name}",
+        )
+
+    started = time.monotonic()
+    try:
+        with span("upstream", endpoint=endpoint.name, model=model.model) as call_span:
+            status, body = await asyncio.wait_for(
+                fetch_hedged() if model.hedge else fetch(endpoint),
+                timeout=model.timeout
+            )
+            if call_span:
+                call_span["attrs"]["status"] = status
+    except asyncio.TimeoutError:
+        logger.warning(f"Model {model.model} timed out after {model.timeout}s")
+        task_info["status"] = "timeout"
+        state.breakers.record(endpoint.name, model.model, False)
+        metrics.CANDIDATES.inc(endpoint.name, model.model, "timeout")
+        return None
+    except Exception as exc:
+        logger.warning(f"Model {model.model} failed: {exc}")
+        task_info["status"] = "error"
+        state.breakers.record(endpoint.name, model.model, False)
+        metrics.CANDIDATES.inc(endpoint.name, model.model, "error")
+        return None
+    finally:
+        task_info["elapsed"] = time.monotonic() - started
+
+    task_info["status"] = status
+    metrics.CANDIDATES.inc(endpoint.name, model.model, str(status))
+    if status != 200:
+        logger.warning(f"Model {model.model} returned HTTP {status}")
+        return None
+    logger.debug(
+        f"Model {model.model} answered: ttfb={task_info.get('ttfb', 0):.2f}s "
+        f"total={task_info['elapsed']:.2f}s"
+    )
+    task_info["body"] = body
+    if body.get("usage"):
+        metrics.record_usage(endpoint.name, model.model, body["usage"])
+    if cache:
+        await cache.set(key, body)
+    return body
 
 async def _verify_api_key(
     request: Request,
@@ -93,119 +292,592 @@ async def _verify_api_key(
             headers={"WWW-Authenticate": "Bearer"}
         )
 
-@app.post("/v1/chat/completions", dependencies=[Depends(_verify_api_key)])
-async def chat_completions(req: ChatCompletionRequest, request: Request):
-    logger.info("Starting request processing")
-    rid = request.state.id
-    config: AppConfig = request.app.state.config
-    client = request.app.state.http_client
+@router.get("/healthz")
+async def healthz():
+    """Liveness: the process is serving requests"""
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz(
+    request: Request,
+    authorization: Optional[str] = Header(None, convert_underscores=False),
+    x_api_key: Optional[str] = Header(None)
+):
+    """
+    Readiness: config loaded and pools warm. Open to load balancer checks; the
+    cached endpoint reachability is included only for authenticated callers.
+    """
+    report = request.app.state.health.readiness()
+    try:
+        await _verify_api_key(request, authorization, x_api_key)
+    except HTTPException:
+        report.pop("endpoints", None)
+    return Response(
+        content=codec.dumpb(report),
+        status_code=200 if report["ready"] else 503,
+        media_type="application/json"
+    )
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(_verify_api_key)])
+async def metrics_endpoint(request: Request):
+    return metrics.render(request.app.state)
 
+@router.post("/admin/reload", dependencies=[Depends(_verify_api_key)])
+async def reload_config(request: Request):
+    """Swap in config.yaml; in-flight requests finish on the previous generation"""
+    state = request.app.state
+    if state.settings.workers > 1 and not state.store:
+        raise HTTPException(
+            status_code=409,
+            detail="Reload would reach only this worker; set shared_state_path, or rely on reload_interval"
+        )
+    try:
+        gen = await request.app.state.generations.reload()
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Config reload failed: {exc}")
+    return {"generation": gen.number}
+
+async def _collect_inputs(
+    req: ChatCompletionRequest,
+    state: Generation,
+    tasks_info: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Run context composition and model fan-out, returning the critic inputs"""
+    config: AppConfig = state.config
+    cache: Optional[ResponseCache] = state.cache
     logger.info(f"Preparing {len(config.models)} model tasks")
+    client_params = req.model_dump(exclude_unset=True, exclude=GATEWAY_FIELDS)
+    timings: Dict[str, float] = {}
+
+    async def compose_context():
+        started = time.monotonic()
+        try:
+            with span("context"):
+                return await state.critic.compose_context_question(req.messages)
+        finally:
+            timings["context"] = time.monotonic() - started
+            metrics.CONTEXT_SECONDS.observe(timings["context"])
+
     # Parallelize context composition and model queries
-    context_task = app.state.critic.compose_context_question(req.messages)
+    context_task = asyncio.create_task(compose_context())
     model_tasks = []
-    tasks_info = []
 
     for model in config.models:
-        endpoint = next((e for e in config.endpoints if e.name == model.endpoint), None)
+        endpoint = config.get_endpoint(model.endpoint)
         if not endpoint:
             continue
+        if not state.breakers.allow(endpoint.name, model.model):
+            logger.info(f"Skipping {model.model}: circuit open")
+            metrics.CANDIDATES.inc(endpoint.name, model.model, "circuit_open")
+            continue
 
         # Merge payloads (model params first, client overrides)
-        payload = {**model.params, **req.dict(exclude_unset=True)}
+        payload = {**model.params, **client_params}
         payload["model"] = model.model
-        payload["stream"] = False  # Force non-streaming for base models
+        if config.stream_candidates:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        else:
+            payload["stream"] = False  # Force non-streaming for base models
 
-        task = call_endpoint(client, endpoint, payload)
-        model_tasks.append(task)
-        tasks_info.append({
+        task_info = {
             "endpoint": model.endpoint,
             "model": model.model,
             "payload": payload
-        })
+        }
+        model_tasks.append(asyncio.create_task(
+            query_model(state, endpoint, model, task_info)
+        ))
+        tasks_info.append(task_info)
+
+    # Strategies like `tournament` start merging candidates as they arrive
+    session = state.critic.open_session(context_task, len(model_tasks))
+    if session:
+        for task in model_tasks:
+            task.add_done_callback(session.on_task_done)
 
     logger.debug("Starting parallel execution")
-    results = await asyncio.gather(*model_tasks, return_exceptions=True)
-    logger.info(f"Collected {len(results)} responses")
-    context = await context_task
+    quorum = config.quorum
+    fanout_started = time.monotonic()
+    try:
+        pending = await wait_for_quorum(
+            model_tasks,
+            min_candidates=req.min_candidates if req.min_candidates is not None else quorum.min_candidates,
+            soft_deadline=req.soft_deadline if req.soft_deadline is not None else quorum.soft_deadline,
+        )
+    except asyncio.CancelledError:
+        # Client went away (or shutdown): stop everything, or only warm the cache
+        context_task.cancel()
+        if session:
+            session.cancel()
+        unfinished = {task for task in model_tasks if not task.done()}
+        release_stragglers(
+            unfinished,
+            "background" if cache and config.disconnect.finish_candidates else "cancel",
+            state.background
+        )
+        raise
+    if session:
+        session.freeze()
+    timings["fanout"] = time.monotonic() - fanout_started
+    record_span("fanout", time.time() - timings["fanout"], timings["fanout"])
+    metrics.FANOUT_SECONDS.observe(timings["fanout"])
+    release_stragglers(pending, quorum.stragglers, state.background)
+
+    # Collect candidates that arrived before quorum, in config order
+    successful = [
+        task.result() for task in model_tasks
+        if task.done() and not task.cancelled() and task.result() is not None
+    ]
+    logger.info(f"Collected {len(successful)} of {len(model_tasks)} candidates")
+    if not successful:
+        context_task.cancel()
+        if session:
+            session.cancel()
+        targets = [(model.endpoint, model.model) for model in config.models]
+        raise NoCandidates(
+            "No model is available" if not model_tasks else "Every model failed",
+            state.breakers.retry_after(targets)
+        )
+
+    # Same candidate set as a previous request: reuse its critic answer
+    final_key = critic_key(config.critic, req.messages, successful) if cache and successful else None
+    cached_resp = await cache.get(final_key) if final_key else None
+    if cached_resp is not None:
+        logger.info("Critic cache hit")
+        context_task.cancel()
+        context = None
+        if session:
+            session.cancel()
+            session = None
+    else:
+        context = await context_task
+
+    # Keep the fan-out so critic strategies can be replayed offline (replay.py)
+    if state.recorder and successful:
+        state.recorder.submit(
+            request_id_ctx.get(), req.messages, successful, tasks_info, context, timings
+        )
+
+    return {
+        "successful": successful,
+        "context": context,
+        "cached_resp": cached_resp,
+        "final_key": final_key,
+        "session": session,
+        "timings": timings,
+    }
+
+async def _complete(
+    req: ChatCompletionRequest,
+    state: Generation,
+    rid: str,
+    tracer: Optional[TraceWriter],
+    started: float
+) -> dict:
+    """Fan out, run the critic and return the final (non-streamed) response"""
+    tasks_info: List[Dict[str, Any]] = []
+    cache: Optional[ResponseCache] = state.cache
+    inputs = await _collect_inputs(req, state, tasks_info)
+    successful, context = inputs["successful"], inputs["context"]
+    cached_resp, final_key = inputs["cached_resp"], inputs["final_key"]
+
+    logger.info("Starting non-streaming critic execution")
+    critic_started = time.monotonic()
+    if cached_resp is not None:
+        final_resp = cached_resp
+    else:
+        with span("critic", mode="complete"):
+            final_resp = await state.critic.run_critic(successful, context, inputs["session"])
+        metrics.CRITIC_SECONDS.observe(time.monotonic() - critic_started, "complete")
+        # Fallback responses (critic failure) carry no id and are not cached
+        if final_key and final_resp.get("id"):
+            await cache.set(final_key, final_resp)
 
-    # Process responses
-    successful = []
-    for task_info, res in zip(tasks_info, results):
-        if isinstance(res, httpx.Response) and res.status_code == 200:
-            task_info["body"] = res.json()
-            successful.append(task_info["body"])
+    if tracer:
+        message = (final_resp.get("choices") or [{}])[0].get("message") or {}
+        tracer.submit(build_trace(
+            rid, req.messages, tasks_info, context,
+            critic={
+                "content": message.get("content"),
+                "reasoning": message.get("reasoning"),
+                "usage": final_resp.get("usage"),
+                "cached": cached_resp is not None,
+                "elapsed": time.monotonic() - critic_started,
+            },
+            timings={**inputs["timings"], "total": time.monotonic() - started},
+        ))
+
+    logger.info("Request processing finished")
+    return final_resp
+
+def _finish_spans(state: Generation, trace: Optional[SpanTrace], started: float) -> Optional[str]:
+    """Close the request span, export the trace and return the Server-Timing summary"""
+    if trace is None:
+        return None
+    duration = time.monotonic() - started
+    trace.add("request", time.time() - duration, duration, span_id=trace.root_id)
+    if state.span_writer:
+        state.span_writer.submit(trace.export())
+    return trace.server_timing() if state.config.spans.server_timing else None
+
+def _unavailable(exc: NoCandidates) -> HTTPException:
+    logger.warning(f"No candidates: {exc}")
+    return HTTPException(
+        status_code=503,
+        detail=str(exc),
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+def _releaser(
+    state: Generation, admission: Optional[AdmissionController] = None
+) -> Callable[[], Awaitable[None]]:
+    """
+    Idempotent release of a streamed response's admission slot and generation. It runs
+    from the body's finally and again as the response background task; the latter
+    covers bodies that are never iterated.
+    """
+    released = False
+
+    async def release():
+        nonlocal released
+        if not released:
+            released = True
+            if admission:
+                admission.release()
+            state.leave()
+
+    return release
+
+async def _chain(head: List[Any], rest: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """Yield the items already read, then the rest of the iterator"""
+    for item in head:
+        yield item
+    async for item in rest:
+        yield item
+
+@router.post("/v1/chat/completions", dependencies=[Depends(_verify_api_key)])
+async def chat_completions(req: ChatCompletionRequest, request: Request):
+    logger.info("Starting request processing")
+    rid = request.state.id
+    # Pin the current config generation until the response is finished
+    state: Generation = request.app.state.generations.acquire()
+    config: AppConfig = state.config
+    cache: Optional[ResponseCache] = state.cache
+    tasks_info: List[Dict[str, Any]] = []
+    flights: Optional[SingleFlight] = state.flights
+    flight_key = request_key(req.model_dump(exclude_unset=True)) if flights else None
+    tracer: Optional[TraceWriter] = state.tracer if state.tracer and state.tracer.sampled() else None
+    started = time.monotonic()
+    spans_on = bool(config.spans.directory or config.spans.server_timing)
+    trace: Optional[SpanTrace] = start_trace(rid) if spans_on else None
+
+    # Bounded gateway-wide queue; shed load instead of piling up coroutines
+    admission: AdmissionController = state.admission
+    try:
+        await admission.acquire()
+    except Overloaded as exc:
+        logger.warning(f"Rejecting request: {exc}")
+        metrics.REJECTED.inc()
+        state.leave()
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)}
+        )
+    except BaseException:
+        state.leave()  # Cancelled while queued (client gone, shutdown): let the generation drain
+        raise
 
     # Streaming path
     if req.stream:
-        logger.info("Starting streaming critic execution")
+        logger.info("Starting streaming request")
 
         async def stream_generator():
-            full_content = ""
-            full_reasoning = ""
+            # Keep the connection alive while candidates arrive
+            collect_task = asyncio.create_task(
+                _collect_inputs(req, state, tasks_info)
+            )
+            started_stream = False
+            try:
+                while True:
+                    done, _ = await asyncio.wait({collect_task}, timeout=config.keepalive_interval)
+                    if done:
+                        break
+                    arrived = sum(1 for info in tasks_info if "body" in info)
+                    started_stream = True
+                    yield f": waiting for candidates ({arrived}/{len(tasks_info)})\n\n"
+            finally:
+                if not collect_task.done():
+                    collect_task.cancel()
+            try:
+                inputs = collect_task.result()
+            except NoCandidates as exc:
+                if not started_stream:
+                    raise  # Still before the status line: the handler answers 503
+                logger.warning(f"No candidates after keepalives: {exc}")
+                yield f"data: {codec.dumps({'error': {'message': str(exc), 'type': 'no_candidates', 'code': 503}})}\n\n"
+                yield "data: [DONE]\n\n"
+                return
+            successful, context = inputs["successful"], inputs["context"]
+            cached_resp, final_key = inputs["cached_resp"], inputs["final_key"]
+
+            async def replay_cached():
+                for chunk in completion_to_chunks(cached_resp):
+                    yield chunk
+
+            logger.info("Starting streaming critic execution")
+            content_parts: List[str] = []
+            reasoning_parts: List[str] = []
+            critic_usage = None
+            critic_ttfb = None
+            failed = False
             # Instantiate the filter per request if enabled
-            reasoning_filter = ReasoningFilter() if REASONING_FILTER_ENABLED else None
+            reasoning_filter = ReasoningFilter() if state.settings.reasoning_as_think else None
+            source = (
+                replay_cached() if cached_resp is not None
+                else state.critic.run_critic_stream(successful, context, inputs["session"])
+            )
+            # The critic always reports usage; its usage-only tail reaches only clients that asked
+            include_usage = bool((req.stream_options or {}).get("include_usage"))
+            critic_started = time.monotonic()
+            first_chunk = True
             try:
-                async for chunk in app.state.critic.run_critic_stream(successful, context):
+                # Reasoning critics are slowest to their first token: keep the connection alive
+                iterator = source.__aiter__()
+                pending = asyncio.ensure_future(iterator.__anext__())
+                try:
+                    while True:
+                        done, _ = await asyncio.wait({pending}, timeout=config.keepalive_interval)
+                        if done:
+                            break
+                        yield ": waiting for critic\n\n"
+                finally:
+                    if not pending.done():
+                        pending.cancel()
+                try:
+                    head = [pending.result()]
+                except StopAsyncIteration:
+                    head = []
+                async for chunk in _chain(head, iterator):
+                    if first_chunk and cached_resp is None:
+                        critic_ttfb = time.monotonic() - critic_started
+                        metrics.CRITIC_TTFB.observe(critic_ttfb)
+                    first_chunk = False
+                    critic_usage = chunk.get("usage") or critic_usage
+                    failed = failed or str(chunk.get("id", "")).startswith(("critic-error-", "critic-fallback-"))
+                    if not chunk.get("choices") and not include_usage:
+                        continue
+                    modified = reasoning_filter is not None
                     # Accumulate raw content/reasoning for debug trace
                     if chunk.get("choices") and chunk["choices"][0].get("delta"):
                         delta = chunk["choices"][0]["delta"]
                         if "reasoning" in delta:
                             # Mirror reasoning for better compatibility
                             delta["reasoning_content"] = delta["reasoning"]
-                        full_content += delta.get("content", "") or ""
-                        full_reasoning += delta.get("reasoning", "") or ""
+                            modified = True
+                        if delta.get("content"):
+                            content_parts.append(delta["content"])
+                        if delta.get("reasoning"):
+                            reasoning_parts.append(delta["reasoning"])
+                    raw = getattr(chunk, "raw", None)
+                    if raw is not None and not modified:
+                        # Untouched upstream chunk: forward its bytes as-is
+                        yield f"data: {raw}\n\n"
+                        continue
                     # Apply reasoning filter if enabled
                     filtered_chunk = reasoning_filter.stream(chunk) if reasoning_filter else chunk
-                    yield f"data: {json.dumps(filtered_chunk)}\n\n"
+                    yield f"data: {codec.dumps(filtered_chunk)}\n\n"
+
+                if cached_resp is None:
+                    critic_elapsed = time.monotonic() - critic_started
+                    metrics.CRITIC_SECONDS.observe(critic_elapsed, "stream")
+                    critic_wall = time.time() - critic_elapsed
+                    if critic_ttfb is not None:
+                        record_span("critic_ttfb", critic_wall, critic_ttfb)
+                    record_span("critic", critic_wall, critic_elapsed, mode="stream")
+                if final_key and cached_resp is None and not failed:
+                    await cache.set(final_key, format_response({
+                        "role": "assistant",
+                        "content": "".join(content_parts),
+                        "reasoning": "".join(reasoning_parts) or None
+                    }, critic_usage))
             finally:
-                # Write debug trace after stream completes
-                if DEBUG_REQUESTS_DIR:
-                    final_resp = {
-                        "choices": [{"message": {"content": full_content}}],
-                        "usage": {"total_tokens": len(full_content.split())}
-                    }
-                    await asyncio.get_running_loop().run_in_executor(
-                        None,
-                        write_debug_trace,
-                        req.messages,
-                        tasks_info,
-                        context,
-                        final_resp,
-                        DEBUG_REQUESTS_DIR,
-                        rid,
-                        full_reasoning
-                    )
+                # Queue debug trace after stream completes
+                if tracer:
+                    tracer.submit(build_trace(
+                        rid, req.messages, tasks_info, context,
+                        critic={
+                            "content": "".join(content_parts),
+                            "reasoning": "".join(reasoning_parts),
+                            "usage": critic_usage,
+                            "cached": cached_resp is not None,
+                            "ttfb": critic_ttfb,
+                            "elapsed": time.monotonic() - critic_started,
+                        },
+                        timings={**inputs["timings"], "total": time.monotonic() - started},
+                    ))
 
+            timing = _finish_spans(state, trace, started)
+            if timing:
+                yield f": server-timing {timing}\n\n"
             yield "data: [DONE]\n\n"
 
-        return StreamingResponse(
-            stream_generator(),
-            media_type="text/event-stream",
-            headers={"Cache-Control": "no-cache"}
-        )
+        release = _releaser(state, admission)
+
+        async def admitted(first, body):
+            try:
+                if first is not None:
+                    yield first
+                async for chunk in body:
+                    yield chunk
+            finally:
+                await release()
+
+        try:
+            body = flights.stream(flight_key, stream_generator) if flight_key else stream_generator()
+            body = relay_until_disconnected(request, body, config.disconnect.poll_interval)
+            # Hold the status line until the first chunk so an empty fan-out is a real 503
+            try:
+                first = await body.__anext__()
+            except StopAsyncIteration:
+                first = None
+            except NoCandidates as exc:
+                raise _unavailable(exc)
+            return StreamingResponse(
+                admitted(first, body),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+                background=BackgroundTask(release)
+            )
+        except BaseException:
+            await release()
+            raise
 
     # Non-streaming path
-    logger.info("Starting non-streaming critic execution")
-    final_resp = await app.state.critic.run_critic(successful, context)
-
-    # Extract reasoning if present
-    reasoning = ""
-    if final_resp.get("choices") and final_resp["choices"][0].get("message"):
-        reasoning = final_resp["choices"][0]["message"].get("reasoning", "")
-
-    if DEBUG_REQUESTS_DIR:
-        await asyncio.get_running_loop().run_in_executor(
-            None,
-            write_debug_trace,
-            req.messages,
-            tasks_info,
-            context,
-            final_resp,
-            DEBUG_REQUESTS_DIR,
-            rid,
-            reasoning
+    def complete():
+        return _complete(req, state, rid, tracer, started)
+
+    try:
+        final_resp = await run_until_disconnected(
+            request,
+            flights.do(flight_key, complete) if flight_key else complete(),
+            config.disconnect.poll_interval
+        )
+        timing = _finish_spans(state, trace, started)
+        return Response(
+            content=codec.dumpb(final_resp),
+            media_type="application/json",
+            headers={"Server-Timing": timing} if timing else None
         )
+    except ClientDisconnected:
+        return Response(status_code=499)  # Client closed request; nobody reads this
+    except NoCandidates as exc:
+        raise _unavailable(exc)
+    finally:
+        admission.release()
+        state.leave()
 
-    logger.info("Request processing finished")
-    return final_resp
+class BatchItem(BaseModel):
+    custom_id: str
+    body: ChatCompletionRequest
+
+def _batch_result(custom_id: Optional[str], status: int, body: Optional[dict], error: Optional[str] = None) -> bytes:
+    return codec.dumpb({
+        "custom_id": custom_id,
+        "response": {"status_code": status, "body": body} if body is not None else None,
+        "error": error,
+    }) + b"\n"
+
+@router.post("/v1/batch", dependencies=[Depends(_verify_api_key)])
+async def batch(request: Request):
+    """
+    Run a JSONL body of {"custom_id", "body"} chat requests with bounded
+    concurrency, streaming one JSONL result per item in completion order.
+    """
+    rid = request.state.id
+    # Read the upload before pinning a generation so a slow client cannot hold one open
+    lines = [line for line in (await request.body()).splitlines() if line.strip()]
+    state: Generation = request.app.state.generations.acquire()
+    config: AppConfig = state.config
+    admission: AdmissionController = state.admission
+    logger.info("Starting batch of %s items", len(lines))
+    results: asyncio.Queue = asyncio.Queue()
+    pending = iter(lines)
+
+    async def run_item(line: bytes) -> bytes:
+        custom_id = None
+        try:
+            record = codec.loads(line)
+            custom_id = record.get("custom_id")
+            item = BatchItem(**record)
+        except Exception as exc:
+            return _batch_result(custom_id, 400, None, f"Invalid batch line: {exc}")
+        # Items share the gateway-wide queue with interactive requests
+        try:
+            await admission.acquire()
+        except Overloaded as exc:
+            metrics.REJECTED.inc()
+            return _batch_result(item.custom_id, 429, None, str(exc))
+        item_id = f"{rid}:{item.custom_id}"
+        token = request_id_ctx.set(item_id)
+        try:
+            item.body.stream = False
+            tracer = state.tracer if state.tracer and state.tracer.sampled() else None
+            started = time.monotonic()
+            trace = start_trace(item_id) if state.span_writer else None
+            resp = await _complete(item.body, state, item_id, tracer, started)
+            _finish_spans(state, trace, started)
+            return _batch_result(item.custom_id, 200, resp)
+        except NoCandidates as exc:
+            return _batch_result(item.custom_id, 503, None, str(exc))
+        except Exception as exc:
+            logger.warning(f"Batch item failed: {exc}")
+            return _batch_result(item.custom_id, 500, None, str(exc))
+        finally:
+            request_id_ctx.reset(token)
+            admission.release()
+
+    async def worker():
+        # Items are pulled lazily so at most max_concurrency are in flight
+        for line in pending:
+            await results.put(await run_item(line))
+
+    async def generate():
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(config.batch.max_concurrency, len(lines)))
+        ]
+        try:
+            for _ in range(len(lines)):
+                yield await results.get()
+            logger.info("Batch finished")
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await release()
+
+    release = _releaser(state)
+
+    try:
+        return StreamingResponse(
+            relay_until_disconnected(request, generate(), config.disconnect.poll_interval),
+            media_type="application/x-ndjson",
+            background=BackgroundTask(release),
+        )
+    except BaseException:
+        await release()
+        raise
+
+def create_app() -> FastAPI:
+    """App factory; each worker process builds its own app from the environment"""
+    if os.getenv("MOM_LOG_LEVEL"):
+        configure_logging(os.environ["MOM_LOG_LEVEL"])
+    application = FastAPI(title="Mixture-of-Models Gateway", lifespan=lifespan)
+    application.state.settings = RuntimeSettings.from_env()
+    application.add_middleware(RequestIdMiddleware)
+    application.include_router(router)
+    return application
+
+app = create_app()
@@ -0,0 +1,103 @@
+"""
+Run a JSONL file of chat requests through a running gateway's /v1/batch endpoint.
+
+    python batch.py prompts.jsonl results.jsonl --url http://localhost:8000
+
+Each input line is either {"custom_id": ..., "body": {<chat request>}} or a bare
+chat request (its line number becomes the custom_id). Results are appended to the
+output file as they complete, which doubles as the checkpoint: rerunning skips
+items that already have a successful result there.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Set
+import httpx
+
+from utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
+def read_items(path: Path) -> List[Dict]:
+    """Parse the input file, raising ValueError naming the first malformed line"""
+    items = []
+    with open(path) as fh:
+        for number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path}:{number}: invalid JSON ({exc})") from None
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{number}: expected a JSON object")
+            if "body" not in record:
+                record = {"custom_id": str(number), "body": record}
+            elif record.get("custom_id") is None:
+                raise ValueError(f"{path}:{number}: missing custom_id")
+            record["custom_id"] = str(record["custom_id"])
+            items.append(record)
+    return items
+
+def finished_ids(path: Path) -> Set[str]:
+    """custom_ids with a successful result in an existing output file"""
+    done: Set[str] = set()
+    if not path.exists():
+        return done
+    with open(path) as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn last line from an interrupted run
+            if record.get("custom_id") is not None and not record.get("error"):
+                done.add(record["custom_id"])
+    return done
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Batch chat requests through the gateway")
+    parser.add_argument("input", type=Path, help="JSONL file of chat requests")
+    parser.add_argument("output", type=Path, help="JSONL results, appended (and used to resume)")
+    parser.add_argument("--url", default="http://localhost:8000", help="Gateway base URL")
+    parser.add_argument("--api-key", default=os.getenv("MOM_API_KEY"), help="Gateway API key")
+    args = parser.parse_args()
+    configure_logging()
+
+    try:
+        items = read_items(args.input)
+    except ValueError as exc:
+        logger.error("%s", exc)
+        return 1
+    done = finished_ids(args.output)
+    todo = [item for item in items if item["custom_id"] not in done]
+    logger.info("%s items, %s already finished, %s to run", len(items), len(items) - len(todo), len(todo))
+    if not todo:
+        return 0
+
+    headers = {"Authorization": f"Bearer {args.api_key}"} if args.api_key else {}
+    body = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in todo)
+    failed = 0
+    with httpx.Client(timeout=httpx.Timeout(30.0, read=None)) as client, open(args.output, "a") as out:
+        with client.stream(
+            "POST", f"{args.url.rstrip('/')}/v1/batch", content=body.encode(), headers=headers
+        ) as resp:
+            if resp.status_code != 200:
+                logger.error("Batch request failed: HTTP %s %s", resp.status_code, resp.read()[:200])
+                return 1
+            for count, line in enumerate(resp.iter_lines(), 1):
+                if not line:
+                    continue
+                out.write(line + "\n")
+                out.flush()
+                if json.loads(line).get("error"):
+                    failed += 1
+                if count % 50 == 0:
+                    logger.info("%s/%s items finished", count, len(todo))
+    logger.info("Batch done: %s succeeded, %s failed", len(todo) - failed, failed)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Load-test the gateway (the real `app.app`) against the bundled mock upstream.
+
+    python bench/load_test.py --models 1,3,6 --concurrency 1,8,32 --requests 200 \
+        --latency fixed:0.2 --output bench_results.json
+
+For every (model count, concurrency) pair a gateway process is started with a
+generated config pointing at the mock, and the driver reports throughput,
+p50/p95/p99 latency, end-to-end time to first token, critic-stream TTFB (from
+the end of fan-out, read from the stream's server-timing comment) and gateway
+overhead as JSON.
+
+Overhead is gateway latency minus two sequential upstream calls (fan-out, then
+critic) measured directly against the mock; it is exact with `fixed:` latency.
+Pass `--baseline previous.json` to fail (exit 1) on regressions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import httpx
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+# Critic stream TTFB span in the gateway's closing `: server-timing` SSE comment
+_CRITIC_TTFB = re.compile(r"\bcritic_ttfb;dur=([\d.]+)")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def summarize(latencies: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+async def wait_ready(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready")
+
+def start_process(args: List[str], env: Optional[dict] = None) -> subprocess.Popen:
+    return subprocess.Popen(args, cwd=ROOT, env={**os.environ, **(env or {})})
+
+def write_config(path: Path, mock_url: str, models: int, extra: dict) -> None:
+    config = {
+        "endpoints": [{"name": "mock", "base_url": mock_url, "api_key": "bench"}],
+        "models": [{"endpoint": "mock", "model": f"bench-model-{i}"} for i in range(models)],
+        "critic": {"endpoint": "mock", "model": "bench-critic"},
+        "coalesce_requests": False,  # Every request must do the full fan-out
+        "spans": {"server_timing": True},  # Source of the critic_ttfb figures
+        **extra,
+    }
+    path.write_text(yaml.safe_dump(config))
+
+async def drive(url: str, concurrency: int, total: int, stream: bool, payload_extra: dict) -> dict:
+    """Send `total` requests with `concurrency` workers, recording latency and first-token times"""
+    latencies: List[float] = []
+    first_tokens: List[float] = []
+    critic_ttfbs: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                body = {
+                    "messages": [{"role": "user", "content": f"bench request {i} {time.time()}"}],
+                    "stream": stream,
+                    **payload_extra,
+                }
+                started = time.monotonic()
+                try:
+                    if stream:
+                        async with client.stream("POST", url, json=body) as resp:
+                            if resp.status_code != 200:
+                                errors += 1
+                                continue
+                            first = True
+                            async for line in resp.aiter_lines():
+                                # Keepalive comments don't count as first byte
+                                if first and line.startswith("data: "):
+                                    first_tokens.append(time.monotonic() - started)
+                                    first = False
+                                elif line.startswith(": server-timing "):
+                                    match = _CRITIC_TTFB.search(line)
+                                    if match:
+                                        critic_ttfbs.append(float(match.group(1)) / 1000)
+                    else:
+                        resp = await client.post(url, json=body)
+                        if resp.status_code != 200:
+                            errors += 1
+                            continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.monotonic() - started)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.monotonic() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "wall_seconds": wall,
+        "throughput_rps": len(latencies) / wall if wall else None,
+        "latency": summarize(latencies),
+        # End to end: includes context, fan-out and quorum wait
+        "first_token": summarize(first_tokens) if stream else None,
+        # Critic stream only, measured by the gateway from the end of fan-out
+        "critic_ttfb": summarize(critic_ttfbs) if stream else None,
+    }
+
+async def run(args) -> List[dict]:
+    mock_port = free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    mock = start_process([
+        sys.executable, "bench/mock_upstream.py",
+        "--port", str(mock_port),
+        "--latency", args.latency,
+        "--error-rate", str(args.error_rate),
+        "--content-tokens", str(args.content_tokens),
+        "--reasoning-tokens", str(args.reasoning_tokens),
+        "--token-interval", str(args.token_interval),
+    ])
+    results = []
+    try:
+        await wait_ready(f"{mock_url}/docs")
+        extra = yaml.safe_load(Path(args.gateway_config).read_text()) if args.gateway_config else {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for models in args.models:
+                for concurrency in args.concurrency:
+                    # Direct upstream latency at the same concurrency, for overhead
+                    direct = await drive(
+                        f"{mock_url}/v1/chat/completions", concurrency,
+                        min(args.requests, 50), False, {"model": "bench-direct"}
+                    )
+
+                    config_path = Path(tmp) / f"config-{models}-{concurrency}.yaml"
+                    write_config(config_path, mock_url, models, extra)
+                    port = free_port()
+                    gateway = start_process(
+                        [sys.executable, "-m", "uvicorn", "app:app",
+                         "--port", str(port), "--log-level", "warning"],
+                        env={"MOM_CONFIG": str(config_path)}
+                    )
+                    try:
+                        await wait_ready(f"http://127.0.0.1:{port}/healthz")
+                        url = f"http://127.0.0.1:{port}/v1/chat/completions"
+                        # Warm up pools before measuring
+                        await drive(url, concurrency, concurrency, args.stream, {})
+                        result = await drive(url, concurrency, args.requests, args.stream, {})
+                    finally:
+                        gateway.terminate()
+                        gateway.wait()
+
+                    direct_p50 = direct["latency"]["p50"]
+                    gateway_p50 = result["latency"]["p50"]
+                    result.update({
+                        "models": models,
+                        "concurrency": concurrency,
+                        "stream": args.stream,
+                        "direct_upstream": direct["latency"],
+                        "overhead_p50": (
+                            gateway_p50 - 2 * direct_p50
+                            if gateway_p50 is not None and direct_p50 is not None else None
+                        ),
+                    })
+                    results.append(result)
+                    print(
+                        f"models={models} concurrency={concurrency} "
+                        f"rps={result['throughput_rps'] or 0:.1f} "
+                        f"p50={gateway_p50 or 0:.3f}s p99={result['latency']['p99'] or 0:.3f}s "
+                        f"overhead={result['overhead_p50'] or 0:.3f}s errors={result['errors']}",
+                        file=sys.stderr
+                    )
+    finally:
+        mock.terminate()
+        mock.wait()
+    return results
+
+def find_regressions(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Compare p95 latency and throughput against a previous run"""
+    previous = {(r["models"], r["concurrency"], r["stream"]): r for r in baseline}
+    problems = []
+    for r in results:
+        old = previous.get((r["models"], r["concurrency"], r["stream"]))
+        if not old:
+            continue
+        name = f"models={r['models']} concurrency={r['concurrency']} stream={r['stream']}"
+        new_p95, old_p95 = r["latency"]["p95"], old["latency"]["p95"]
+        if new_p95 and old_p95 and new_p95 > old_p95 * (1 + tolerance):
+            problems.append(f"{name}: p95 {old_p95:.3f}s -> {new_p95:.3f}s")
+        new_rps, old_rps = r["throughput_rps"], old["throughput_rps"]
+        if new_rps and old_rps and new_rps < old_rps * (1 - tolerance):
+            problems.append(f"{name}: throughput {old_rps:.1f} -> {new_rps:.1f} rps")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateway load test against a mock upstream")
+    parser.add_argument("--models", default="1,3,6", help="Comma-separated model counts")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--stream", action="store_true", help="Use streaming requests (reports first-token and critic TTFB)")
+    parser.add_argument("--latency", default="fixed:0.1", help="Mock latency spec")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--content-tokens", type=int, default=200)
+    parser.add_argument("--reasoning-tokens", type=int, default=0)
+    parser.add_argument("--token-interval", type=float, default=0.0)
+    parser.add_argument("--gateway-config", help="YAML merged into the generated gateway config")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Previous JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args()
+    args.models = [int(v) for v in args.models.split(",")]
+    args.concurrency = [int(v) for v in args.concurrency.split(",")]
+
+    results = asyncio.run(run(args))
+    report = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(report)
+    else:
+        print(report)
+
+    if args.baseline:
+        problems = find_regressions(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
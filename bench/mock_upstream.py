@@ -0,0 +1,128 @@
+"""
+Mock OpenAI-compatible upstream for benchmarking the gateway without real providers.
+
+    python bench/mock_upstream.py --port 9100 --latency lognormal:1.0:0.5 --error-rate 0.02
+
+Latency specs: `fixed:SECONDS`, `uniform:LOW:HIGH`, `lognormal:MEDIAN:SIGMA`.
+A model name may override the spec with an `@spec` suffix, e.g. `slow@fixed:5`.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+class MockSettings:
+    latency = "fixed:0"
+    error_rate = 0.0
+    content_tokens = 200
+    reasoning_tokens = 0
+    token_interval = 0.0
+
+settings = MockSettings()
+app = FastAPI(title="Mock OpenAI upstream")
+
+def sample_latency(spec: str) -> float:
+    kind, _, params = spec.partition(":")
+    args = [float(p) for p in params.split(":") if p]
+    if kind == "fixed":
+        return args[0] if args else 0.0
+    if kind == "uniform":
+        return random.uniform(args[0], args[1])
+    if kind == "lognormal":
+        return random.lognormvariate(math.log(args[0]), args[1])
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+def _words(n: int, prefix: str) -> list:
+    return [f"{prefix}{i} " for i in range(n)]
+
+def _chunk(cid: str, model: str, delta: dict, finish_reason=None) -> str:
+    return "data: " + json.dumps({
+        "id": cid,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }) + "\n\n"
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "mock", "object": "model"}]}
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "mock")
+    spec = model.split("@", 1)[1] if "@" in model else settings.latency
+    delay = sample_latency(spec)
+
+    if random.random() < settings.error_rate:
+        await asyncio.sleep(delay / 2)
+        return JSONResponse({"error": {"message": "mock failure"}}, status_code=503)
+
+    reasoning = _words(settings.reasoning_tokens, "think")
+    content = _words(settings.content_tokens, f"{model}-word")
+    usage = {
+        "prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in body.get("messages", [])),
+        "completion_tokens": len(reasoning) + len(content),
+    }
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    cid = f"mock-{uuid.uuid4().hex}"
+
+    if not body.get("stream"):
+        await asyncio.sleep(delay)
+        message = {"role": "assistant", "content": "".join(content)}
+        if reasoning:
+            message["reasoning"] = "".join(reasoning)
+        return {
+            "id": cid,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    async def generate():
+        # Latency is time to first token; the rest is paced by token_interval
+        await asyncio.sleep(delay)
+        for token in reasoning:
+            yield _chunk(cid, model, {"reasoning": token})
+            if settings.token_interval:
+                await asyncio.sleep(settings.token_interval)
+        for token in content:
+            yield _chunk(cid, model, {"content": token})
+            if settings.token_interval:
+                await asyncio.sleep(settings.token_interval)
+        yield _chunk(cid, model, {}, finish_reason="stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield "data: " + json.dumps({"id": cid, "choices": [], "usage": usage}) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible upstream")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="fixed:0", help="Default latency spec")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--content-tokens", type=int, default=200)
+    parser.add_argument("--reasoning-tokens", type=int, default=0)
+    parser.add_argument("--token-interval", type=float, default=0.0, help="Seconds between streamed tokens")
+    args = parser.parse_args()
+
+    settings.latency = args.latency
+    settings.error_rate = args.error_rate
+    settings.content_tokens = args.content_tokens
+    settings.reasoning_tokens = args.reasoning_tokens
+    settings.token_interval = args.token_interval
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import codec
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from config import CacheConfig
+from shared_state import connect
+
+logger = logging.getLogger(__name__)
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Canonical form of chat history used for cache keys"""
+    normalized = []
+    for m in messages:
+        entry = {k: v for k, v in m.items() if v is not None}
+        if isinstance(entry.get("content"), str):
+            entry["content"] = entry["content"].strip()
+        normalized.append(entry)
+    return normalized
+
+def cache_key(*parts: Any) -> str:
+    """Content-addressed key over JSON-serializable parts"""
+    return hashlib.sha256(codec.dumpb(parts, sort_keys=True)).hexdigest()
+
+def request_key(body: dict) -> str:
+    """Identity of a client request, used to coalesce identical in-flight requests"""
+    body = {**body, "messages": normalize_messages(body.get("messages", []))}
+    return cache_key("request", body)
+
+def candidate_key(endpoint: str, payload: dict) -> str:
+    # Streamed and non-streamed candidates assemble to the same body
+    payload = {k: v for k, v in payload.items() if k not in ("stream", "stream_options")}
+    payload["messages"] = normalize_messages(payload.get("messages", []))
+    return cache_key("candidate", endpoint, payload)
+
+def critic_key(critic_cfg: Any, messages: List[Dict[str, Any]], candidates: List[dict]) -> str:
+    contents = [c["choices"][0]["message"].get("content") for c in candidates]
+    settings = critic_cfg.model_dump() if critic_cfg else None
+    return cache_key("critic", settings, normalize_messages(messages), contents)
+
+def prefix_hashes(messages: List[Dict[str, Any]]) -> List[str]:
+    """Chained hash of every conversation prefix; entry i covers messages[:i + 1]"""
+    hashes = []
+    digest = b""
+    for m in normalize_messages(messages):
+        digest = hashlib.sha256(digest + codec.dumpb(m, sort_keys=True)).digest()
+        hashes.append(digest.hex())
+    return hashes
+
+class MemoryTier:
+    """LRU with per-entry TTL, bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.time():
+            self._remove(key)
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, expires: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if key in self._items:
+            self._remove(key)
+        self._items[key] = (expires, value)
+        self.size += len(value)
+        while len(self._items) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._items)))
+
+    def _remove(self, key: str) -> None:
+        _, value = self._items.pop(key)
+        self.size -= len(value)
+
+class SqliteTier:
+    """Persistent tier surviving restarts; blocking calls run in a worker thread"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = connect(path)  # WAL, so worker processes can share the file
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, expires REAL NOT NULL, value BLOB NOT NULL)"
+            )
+            self._db.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT expires, value FROM cache WHERE key = ? AND expires >= ?",
+                (key, time.time())
+            ).fetchone()
+        return row
+
+    def set(self, key: str, value: bytes, expires: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, expires, value) VALUES (?, ?, ?)",
+                (key, expires, value)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+class ResponseCache:
+    """Two-tier cache for candidate bodies and critic responses"""
+
+    def __init__(self, cfg: CacheConfig, shared_path: Optional[str] = None):
+        self.ttl = cfg.ttl
+        self.memory = MemoryTier(cfg.max_entries, cfg.max_bytes)
+        # Without its own file the disk tier lives in the workers' shared state file
+        disk_path = cfg.disk_path or shared_path
+        self.disk = SqliteTier(disk_path) if disk_path else None
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = self.memory.get(key)
+        if value is None and self.disk:
+            try:
+                row = await asyncio.to_thread(self.disk.get, key)
+            except Exception as exc:
+                logger.warning("Disk cache read failed: %s", exc)
+                row = None
+            if row:
+                expires, value = row
+                self.memory.set(key, value, expires)  # Promote
+        return codec.loads(value) if value is not None else None
+
+    async def set(self, key: str, body: dict) -> None:
+        value = codec.dumpb(body)
+        expires = time.time() + self.ttl
+        self.memory.set(key, value, expires)
+        if self.disk:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value, expires)
+            except Exception as exc:
+                logger.warning("Disk cache write failed: %s", exc)
+
+    def close(self) -> None:
+        if self.disk:
+            self.disk.close()
+
+class ContextSummaryCache:
+    """Bounded store of context summaries keyed by conversation prefix"""
+
+    def __init__(self, max_entries: int, ttl: float = 3600.0, max_bytes: int = 16 * 1024 * 1024):
+        self.ttl = ttl
+        self.memory = MemoryTier(max_entries, max_bytes)
+
+    def lookup(self, messages: List[Dict[str, Any]]) -> Tuple[int, Optional[str]]:
+        """Return (prefix length, summary) for the longest cached proper prefix"""
+        hashes = prefix_hashes(messages)
+        for length in range(len(hashes) - 1, 0, -1):
+            value = self.memory.get(hashes[length - 1])
+            if value is not None:
+                return length, value.decode("utf-8")
+        return 0, None
+
+    def store(self, messages: List[Dict[str, Any]], summary: str) -> None:
+        if messages:
+            key = prefix_hashes(messages)[-1]
+            self.memory.set(key, summary.encode("utf-8"), time.time() + self.ttl)
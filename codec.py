@@ -0,0 +1,39 @@
+import json
+from typing import Any
+
+# orjson is optional; it is several times faster on large reasoning-heavy bodies
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+DecodeError = (json.JSONDecodeError, orjson.JSONDecodeError) if orjson else json.JSONDecodeError
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+if orjson:
+    def loads(data: Any) -> Any:
+        return orjson.loads(data)
+
+    def dumpb(obj: Any, sort_keys: bool = False) -> bytes:
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        return orjson.dumps(obj, default=str, option=option)
+else:
+    def loads(data: Any) -> Any:
+        return json.loads(data)
+
+    def dumpb(obj: Any, sort_keys: bool = False) -> bytes:
+        return json.dumps(
+            obj, separators=(",", ":"), sort_keys=sort_keys, default=str, ensure_ascii=False
+        ).encode("utf-8")
+
+def dumps(obj: Any) -> str:
+    return dumpb(obj).decode("utf-8")
+
+class SSEChunk(dict):
+    """Parsed SSE chunk that remembers its raw payload for pass-through forwarding"""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, data: dict, raw: str):
+        super().__init__(data)
+        self.raw = raw
@@ -1,17 +1,104 @@
 import os
 import yaml
-from pydantic import BaseModel
-from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, PrivateAttr, model_validator
+from typing import Any, Dict, List, Literal, Optional
 
 class EndpointConfig(BaseModel):
     name: str
     base_url: str
     api_key: str
+    # Connection pool tuning (one pool per endpoint)
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = False  # Requires the `h2` package
+    connect_timeout: float = 10.0
+    read_timeout: Optional[float] = None  # Defaults to the global timeout
+    # Upstream limits shared by every model on this endpoint
+    max_concurrency: Optional[int] = None
+    rate_limit: Optional[float] = None  # Requests per second
+    rate_burst: Optional[int] = None
+
+class HedgeConfig(BaseModel):
+    delay: Optional[float] = None  # Fixed delay; otherwise the observed percentile
+    percentile: float = 0.95
+    min_samples: int = 20  # Observations needed before percentile hedging starts
+    endpoint: Optional[str] = None  # Alternate endpoint (defaults to the same one)
+    max_rate: float = 0.1  # Max fraction of this model's requests that may be hedged
 
 class ModelConfig(BaseModel):
     endpoint: str
     model: str
     params: Dict[str, Any] = {}
+    timeout: Optional[float] = None  # Hard per-model limit (seconds)
+    max_concurrency: Optional[int] = None
+    rate_limit: Optional[float] = None  # Requests per second
+    rate_burst: Optional[int] = None
+    hedge: Optional[HedgeConfig] = None
+
+class QuorumConfig(BaseModel):
+    min_candidates: Optional[int] = None  # None = wait for every model
+    soft_deadline: Optional[float] = None  # Seconds before critic starts with what arrived
+    stragglers: Literal["cancel", "background"] = "cancel"
+
+class DisconnectConfig(BaseModel):
+    poll_interval: float = 0.5  # Seconds between client disconnect checks; 0 disables
+    finish_candidates: bool = False  # Let started candidate calls finish to warm the cache
+
+class HealthConfig(BaseModel):
+    warm_connections: int = 0  # Keepalive connections pre-opened per endpoint (startup and reload)
+    probe_interval: Optional[float] = None  # Seconds between reachability probes (e.g. 30); None disables
+    probe_path: str = "/v1/models"  # Cheap authenticated GET on each endpoint
+    probe_timeout: float = 5.0
+
+class BatchConfig(BaseModel):
+    max_concurrency: int = 8  # Items of one /v1/batch call processed at once
+
+class AdmissionConfig(BaseModel):
+    max_inflight: Optional[int] = None  # None = unlimited
+    max_queue: int = 100  # Requests allowed to wait for a slot
+    max_queue_wait: float = 30.0  # Seconds before a queued request gets 429
+
+class RetryConfig(BaseModel):
+    attempts: int = 3
+    backoff_base: float = 1.0
+    backoff_max: float = 10.0
+    max_retry_after: float = 30.0  # Longer Retry-After values are not waited for
+    budget_ratio: float = 0.2  # Retries allowed per request, gateway-wide
+    budget_min_per_second: float = 1.0
+    budget_max_tokens: float = 20.0
+
+class BreakerConfig(BaseModel):
+    enabled: bool = True
+    window: int = 20  # Recent calls considered per (endpoint, model)
+    min_requests: int = 5
+    failure_rate: float = 0.5
+    open_seconds: float = 30.0  # Cool-down before a half-open probe
+
+class CacheConfig(BaseModel):
+    enabled: bool = False
+    ttl: float = 3600.0
+    max_entries: int = 1024
+    max_bytes: int = 64 * 1024 * 1024
+    disk_path: Optional[str] = None  # SQLite file for the persistent tier
+
+class TraceConfig(BaseModel):
+    sample_rate: float = 1.0  # Fraction of requests traced when tracing is on
+    queue_size: int = 1000  # Traces beyond this backlog are dropped
+    batch_size: int = 100
+    flush_interval: float = 1.0  # Seconds
+    max_bytes: int = 64 * 1024 * 1024  # Rotate the current file after this size...
+    max_age: float = 3600.0  # ...or this many seconds
+    max_files: Optional[int] = None  # Oldest files beyond this are deleted (all workers)
+
+class RecordConfig(BaseModel):
+    path: Optional[str] = None  # SQLite file for fan-out recordings; None disables recording
+    sample_rate: float = 1.0
+    queue_size: int = 1000  # Records beyond this backlog are dropped
+
+class SpanConfig(BaseModel):
+    directory: Optional[str] = None  # Export per-request spans as gzip JSONL here; None disables
+    server_timing: bool = False  # Server-Timing header / final SSE comment; exposes model and endpoint names
 
 class CriticConfig(BaseModel):
     strategy: str = "merge"
@@ -23,14 +110,68 @@ class CriticConfig(BaseModel):
     user_prompt: Optional[str] = None
     context_system_prompt: Optional[str] = None
     context_user_prompt: Optional[str] = None
+    context_cache_size: int = 256  # Prefix summaries kept; 0 disables
+    dedup_threshold: Optional[float] = None  # Collapse candidates this similar (e.g. 0.9); None disables
+    max_candidate_tokens: Optional[int] = None  # Trim each candidate before the critic
+    # Skip the critic when candidates agree; None disables
+    consensus_threshold: Optional[float] = None  # Similarity for two answers to agree
+    consensus_quorum: float = 0.75  # Fraction of candidates that must agree
+    consensus_max_tokens: Optional[int] = None  # Only short-circuit answers up to this size
 
 class AppConfig(BaseModel):
     endpoints: List[EndpointConfig]
     models: List[ModelConfig]
     critic: Optional[CriticConfig] = None
+    quorum: QuorumConfig = QuorumConfig()
+    disconnect: DisconnectConfig = DisconnectConfig()
+    batch: BatchConfig = BatchConfig()
+    health: HealthConfig = HealthConfig()
+    cache: CacheConfig = CacheConfig()
+    admission: AdmissionConfig = AdmissionConfig()
+    retry: RetryConfig = RetryConfig()
+    breaker: BreakerConfig = BreakerConfig()
+    trace: TraceConfig = TraceConfig()
+    spans: SpanConfig = SpanConfig()
+    record: RecordConfig = RecordConfig()
+    stream_candidates: bool = False  # Ingest base model answers as SSE streams
+    keepalive_interval: float = 15.0  # Seconds between SSE keepalives until the first critic token
+    coalesce_requests: bool = True  # Identical in-flight requests share one run
+    reload_interval: Optional[float] = None  # Seconds between config file checks; None disables
+    shared_state_path: Optional[str] = None  # SQLite file shared by workers: cache, rate limits, breakers
     timeout: float = 180.0
     api_key: Optional[str] = None
 
+    _endpoint_index: Dict[str, EndpointConfig] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._endpoint_index = {e.name: e for e in self.endpoints}
+
+    @model_validator(mode="after")
+    def _check_hedge_endpoints(self) -> "AppConfig":
+        for model in self.models:
+            if model.hedge and model.hedge.endpoint and model.hedge.endpoint not in self._endpoint_index:
+                raise ValueError(f"Model '{model.model}': unknown hedge endpoint '{model.hedge.endpoint}'")
+        return self
+
+    def get_endpoint(self, name: str) -> Optional[EndpointConfig]:
+        return self._endpoint_index.get(name)
+
+class RuntimeSettings(BaseModel):
+    """Command-line switches, passed to worker processes through the environment"""
+    debug_requests_dir: Optional[str] = None
+    debug_requests_sample: Optional[float] = None  # Overrides trace.sample_rate
+    reasoning_as_think: bool = False
+    workers: int = 1
+
+    @classmethod
+    def from_env(cls) -> "RuntimeSettings":
+        return cls(
+            debug_requests_dir=os.getenv("MOM_DEBUG_REQUESTS_DIR") or None,
+            debug_requests_sample=os.getenv("MOM_DEBUG_REQUESTS_SAMPLE") or None,
+            reasoning_as_think=os.getenv("MOM_REASONING_AS_THINK", "").lower() in ("1", "true", "yes"),
+            workers=os.getenv("MOM_WORKERS") or 1,
+        )
+
 def _resolve_env(obj: Any) -> Any:
     """Recursively resolve ${ENV_VAR} placeholders"""
     if isinstance(obj, str) and obj.startswith("${") and obj.endswith("}"):
@@ -41,8 +182,9 @@ def _resolve_env(obj: Any) -> Any:
         return [_resolve_env(item) for item in obj]
     return obj
 
-def load_config(path: str = "config.yaml") -> AppConfig:
-    """Load and validate configuration"""
+def load_config(path: Optional[str] = None) -> AppConfig:
+    """Load and validate configuration (path defaults to $MOM_CONFIG or config.yaml)"""
+    path = path or os.getenv("MOM_CONFIG", "config.yaml")
     with open(path) as fh:
         raw = yaml.safe_load(fh)
     resolved = _resolve_env(raw)
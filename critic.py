@@ -1,40 +1,87 @@
 from critic_strategies import build_strategy
-import httpx
+from critic_strategies.compaction import cluster, compact_candidates, comparable, estimate_tokens
 from config import AppConfig
-from typing import List, Dict, Optional, Any, AsyncGenerator
+from limits import UpstreamLimits
+from pools import EndpointPools
+from typing import List, Dict, Optional, Any, AsyncGenerator, Awaitable
 import logging
 import time
 import uuid
+import metrics
+from utils import completion_to_chunks, format_response
 
 logger = logging.getLogger(__name__)
 
 class CriticService:
-    def __init__(self, app_cfg: AppConfig, http_client: httpx.AsyncClient):
+    def __init__(self, app_cfg: AppConfig, pools: EndpointPools, limits: Optional[UpstreamLimits] = None):
         self.strategy = None
+        self.cfg = app_cfg.critic
         if app_cfg.critic:
-            endpoint = self._get_endpoint(app_cfg, app_cfg.critic.endpoint)
+            endpoint = app_cfg.get_endpoint(app_cfg.critic.endpoint)
             if endpoint:
                 self.strategy = build_strategy(
                     app_cfg.critic,
                     endpoint,
-                    http_client
+                    pools.get(endpoint.name),
+                    limits
                 )
 
-    def _get_endpoint(self, app_cfg: AppConfig, name: str):
-        return next((e for e in app_cfg.endpoints if e.name == name), None)
-
     async def compose_context_question(self, messages: List[Dict[str, Any]]) -> Optional[str]:
         return await self.strategy.compose_context(messages) if self.strategy else None
 
-    async def run_critic(self, candidates: List[dict], context: Optional[str] = None) -> dict:
+    def open_session(self, context: Awaitable[Optional[str]], expected: int):
+        """Incremental session for strategies that merge candidates as they arrive"""
+        return self.strategy.open_session(context, expected) if self.strategy else None
+
+    def _compact(self, candidates: List[dict]) -> List[dict]:
+        """Drop near-duplicates and trim candidates so the critic reads less"""
+        max_tokens = None if self.strategy.answers_verbatim else self.cfg.max_candidate_tokens
+        compacted, saved = compact_candidates(candidates, self.cfg.dedup_threshold, max_tokens)
+        if saved > 0:
+            logger.info("Candidate compaction saved ~%s critic prompt tokens", saved)
+            metrics.CRITIC_TOKENS_SAVED.inc(value=saved)
+        return compacted
+
+    def _consensus(self, candidates: List[dict]) -> Optional[dict]:
+        """Representative candidate when enough candidates give the same answer"""
+        cfg = self.cfg
+        if cfg.consensus_threshold is None or len(candidates) < 2:
+            return None
+        # Tool calls and empty replies count as dissent rather than agreeing with each other
+        texts = [c for c in candidates if comparable(c)]
+        if len(texts) < 2:
+            return None
+        contents = [c["choices"][0]["message"]["content"] for c in texts]
+        if cfg.consensus_max_tokens and max(map(estimate_tokens, contents)) > cfg.consensus_max_tokens:
+            return None
+        largest = max(cluster(contents, cfg.consensus_threshold), key=len)
+        if len(largest) < 2 or len(largest) / len(candidates) < cfg.consensus_quorum:
+            return None
+        logger.info(
+            "Consensus: %s of %s candidates agree, skipping critic", len(largest), len(candidates)
+        )
+        metrics.CONSENSUS.inc()
+        winner = texts[largest[0]]
+        return format_response(winner["choices"][0]["message"], winner.get("usage"))
+
+    async def run_critic(self, candidates: List[dict], context: Optional[str] = None, session=None) -> dict:
         if not self.strategy or not candidates:
             return self._fallback_response(candidates[0])
-        return await self.strategy.run_critic(candidates, context)
+        agreed = self._consensus(candidates)
+        if agreed:
+            if session:
+                session.cancel()
+            return agreed
+        if session:
+            # Early merges already bound the prompt size; compaction would drop merged work
+            return await session.run_critic(candidates)
+        return await self.strategy.run_critic(self._compact(candidates), context)
 
     async def run_critic_stream(
         self,
         candidates: List[dict],
         context: Optional[str] = None,
+        session=None,
     ) -> AsyncGenerator[dict, None]:
         if not self.strategy or not candidates:
             fallback_content = "Critic processing failed: No valid candidates"
@@ -57,7 +104,20 @@ class CriticService:
             }
             return
 
-        async for chunk in self.strategy.run_critic_stream(candidates, context):
+        agreed = self._consensus(candidates)
+        if agreed:
+            if session:
+                session.cancel()
+            for chunk in completion_to_chunks(agreed):
+                yield chunk
+            return
+
+        if session:
+            async for chunk in session.run_critic_stream(candidates):
+                yield chunk
+            return
+
+        async for chunk in self.strategy.run_critic_stream(self._compact(candidates), context):
             yield chunk
 
     def _fallback_response(self, candidate: dict) -> dict:
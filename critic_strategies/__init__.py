@@ -1,19 +1,25 @@
 from .merge import MergeStrategy
+from .tournament import TournamentStrategy
+from .select import SelectStrategy
 from .base import BaseCriticStrategy
 from config import CriticConfig, EndpointConfig
-from typing import Dict, Type
+from limits import UpstreamLimits
+from typing import Dict, Optional, Type
 import httpx
 
 _registry: Dict[str, Type[BaseCriticStrategy]] = {
-    "merge": MergeStrategy
+    "merge": MergeStrategy,
+    "tournament": TournamentStrategy,
+    "select": SelectStrategy,
 }
 
 def build_strategy(
     cfg: CriticConfig,
     endpoint: EndpointConfig,
-    http_client: httpx.AsyncClient
+    http_client: httpx.AsyncClient,
+    limits: Optional[UpstreamLimits] = None
 ) -> BaseCriticStrategy:
     strategy_class = _registry.get(cfg.strategy.lower())
     if not strategy_class:
         raise ValueError(f"Invalid critic strategy: {cfg.strategy}")
-    return strategy_class(cfg, endpoint, http_client)
+    return strategy_class(cfg, endpoint, http_client, limits)
@@ -1,19 +1,50 @@
+import contextvars
 import httpx
-import json
 import uuid
 import time
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from cache import ContextSummaryCache
 from config import CriticConfig, EndpointConfig
-from typing import List, Dict, Any, Optional, AsyncGenerator
+from limits import UpstreamLimits
+from utils import iter_sse_json
+import codec
+from typing import List, Dict, Any, Optional, AsyncContextManager, AsyncGenerator, Awaitable
 import logging
 
 logger = logging.getLogger(__name__)
 
+_usage_ctx: contextvars.ContextVar[Optional[List[dict]]] = contextvars.ContextVar("critic_usage", default=None)
+
+def collect_usage() -> List[dict]:
+    """Collect the usage block of every critic call made from this context (and its child tasks)"""
+    calls: List[dict] = []
+    _usage_ctx.set(calls)
+    return calls
+
+def _note_usage(usage: Optional[dict]) -> None:
+    calls = _usage_ctx.get()
+    if calls is not None and usage:
+        calls.append(usage)
+
 class BaseCriticStrategy(ABC):
-    def __init__(self, cfg: CriticConfig, endpoint: EndpointConfig, http_client: httpx.AsyncClient):
+    # Answers with one of the candidates as-is, so they may be trimmed only in its own prompt
+    answers_verbatim = False
+
+    def __init__(
+        self,
+        cfg: CriticConfig,
+        endpoint: EndpointConfig,
+        http_client: httpx.AsyncClient,
+        limits: Optional[UpstreamLimits] = None
+    ):
         self.cfg = cfg
         self.endpoint = endpoint
         self.http = http_client
+        self.limits = limits
+        self.context_cache = (
+            ContextSummaryCache(cfg.context_cache_size) if cfg.context_cache_size > 0 else None
+        )
 
     @abstractmethod
     async def compose_context(self, messages: List[Dict[str, Any]]) -> Optional[str]:
@@ -34,16 +65,50 @@ class BaseCriticStrategy(ABC):
         """Yield streaming response chunks from critic"""
         pass
 
+    def open_session(self, context: Awaitable[Optional[str]], expected: int):
+        """
+        Per-request session fed candidates as they arrive, for strategies that can
+        start work before the fan-out completes. None means not supported.
+        """
+        return None
+
+    def _hold(self) -> AsyncContextManager[None]:
+        """Critic calls count against the endpoint's concurrency and rate limits"""
+        return self.limits.hold(self.endpoint.name, self.cfg.model) if self.limits else nullcontext()
+
+    @staticmethod
+    def _trivial_context(messages: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Return the question itself when history is a lone user message, with any
+        system instructions kept in front so the critic still sees them.
+        """
+        system = [m.get("content") for m in messages if m.get("role") == "system"]
+        turns = [m for m in messages if m.get("role") != "system"]
+        if len(turns) != 1 or turns[0].get("role") != "user":
+            return None
+        content = turns[0].get("content")
+        if not isinstance(content, str) or not all(isinstance(s, str) for s in system):
+            return None
+        if not system:
+            return content
+        instructions = "\n\n".join(system)
+        return f"System instructions:\n{instructions}\n\nUser question:\n{content}"
+
     async def _call_endpoint(self, payload: dict) -> Optional[dict]:
         """Centralized HTTP call logic"""
         try:
             url = f"{self.endpoint.base_url.rstrip('/')}/v1/chat/completions"
-            resp = await self.http.post(
-                url,
-                headers={"Authorization": f"Bearer {self.endpoint.api_key}"},
-                json=payload
-            )
-            return resp.json() if resp.status_code == 200 else None
+            async with self._hold():
+                resp = await self.http.post(
+                    url,
+                    headers={"Authorization": f"Bearer {self.endpoint.api_key}", **codec.JSON_HEADERS},
+                    content=codec.dumpb(payload)
+                )
+            if resp.status_code != 200:
+                return None
+            body = codec.loads(resp.content)
+            _note_usage(body.get("usage"))
+            return body
         except Exception as e:
             logger.error(f"Endpoint error: {str(e)}")
             return None
@@ -52,12 +117,13 @@ class BaseCriticStrategy(ABC):
         """Robust streaming HTTP caller with error handling"""
         url = f"{self.endpoint.base_url.rstrip('/')}/v1/chat/completions"
         try:
-            async with self.http.stream(
+            async with self._hold(), self.http.stream(
                 "POST",
                 url,
-                headers={"Authorization": f"Bearer {self.endpoint.api_key}"},
-                json={**payload, "stream": True},
-                timeout=None
+                headers={"Authorization": f"Bearer {self.endpoint.api_key}", **codec.JSON_HEADERS},
+                content=codec.dumpb({
+                    **payload, "stream": True, "stream_options": {"include_usage": True}
+                }),
             ) as resp:
                 if resp.status_code != 200:
                     logger.error("Critic stream HTTP %s", resp.status_code)
@@ -77,15 +143,9 @@ class BaseCriticStrategy(ABC):
                     }
                     return
 
-                async for line in resp.aiter_lines():
-                    if line.startswith("data: "):
-                        data = line[6:].strip()
-                        if data == "[DONE]":
-                            return
-                        try:
-                            yield json.loads(data)
-                        except json.JSONDecodeError:
-                            logger.warning("Bad JSON chunk: %s", data)
+                async for chunk in iter_sse_json(resp):
+                    _note_usage(chunk.get("usage"))
+                    yield chunk
 
         except Exception as exc:
             logger.exception("Streaming critic call failed: %s", exc)
@@ -0,0 +1,93 @@
+import logging
+import re
+from typing import FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+TRUNCATION_MARK = "\n[... truncated ...]"
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+def shingles(text: str, k: int = 5) -> FrozenSet[int]:
+    """Hashed word k-shingles of lower-cased text"""
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        return frozenset([hash(tuple(words))])
+    return frozenset(hash(tuple(words[i:i + k])) for i in range(len(words) - k + 1))
+
+def similarity(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    """Jaccard similarity of two shingle sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def cluster(texts: List[str], threshold: float) -> List[List[int]]:
+    """
+    Greedy single-pass clustering: each text joins the first cluster whose
+    representative (its longest member so far) is at least `threshold` similar.
+    """
+    sets = [shingles(t) for t in texts]
+    clusters: List[List[int]] = []
+    for i, s in enumerate(sets):
+        for members in clusters:
+            if similarity(sets[members[0]], s) >= threshold:
+                members.append(i)
+                if len(texts[i]) > len(texts[members[0]]):
+                    members.insert(0, members.pop())  # Longest answer represents
+                break
+        else:
+            clusters.append([i])
+    return clusters
+
+def _content(candidate: dict) -> str:
+    return candidate["choices"][0]["message"].get("content") or ""
+
+def comparable(candidate: dict) -> bool:
+    """Text answers only: tool calls and empty replies never match anything"""
+    message = candidate["choices"][0]["message"]
+    return bool(_content(candidate).strip()) and not message.get("tool_calls")
+
+def _with_content(candidate: dict, content: str) -> dict:
+    # Copy, never mutate: candidate bodies are shared with the cache and traces
+    choice = candidate["choices"][0]
+    return {
+        **candidate,
+        "choices": [{**choice, "message": {**choice["message"], "content": content}}],
+    }
+
+def trim(text: str, max_tokens: Optional[int]) -> str:
+    """Cut text to roughly `max_tokens`, marking the cut"""
+    budget = max_tokens * 4 if max_tokens else None
+    return text[:budget] + TRUNCATION_MARK if budget and len(text) > budget else text
+
+def compact_candidates(
+    candidates: List[dict],
+    dedup_threshold: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> Tuple[List[dict], int]:
+    """
+    Collapse near-duplicate candidates and trim the rest to a token budget.
+    Returns the compacted list (original order) and the estimated tokens saved.
+    """
+    before = sum(estimate_tokens(_content(c)) for c in candidates)
+    kept = candidates
+    texts = [i for i, c in enumerate(candidates) if comparable(c)]
+    if dedup_threshold is not None and len(texts) > 1:
+        groups = cluster([_content(candidates[i]) for i in texts], dedup_threshold)
+        keep = {texts[g[0]] for g in groups}
+        kept = [c for i, c in enumerate(candidates) if i in keep or not comparable(c)]
+        if len(kept) < len(candidates):
+            logger.info("Collapsed %s candidates into %s distinct answers", len(candidates), len(kept))
+
+    if max_tokens:
+        budget = max_tokens * 4
+        kept = [
+            _with_content(c, trim(_content(c), max_tokens)) if len(_content(c)) > budget else c
+            for c in kept
+        ]
+
+    after = sum(estimate_tokens(_content(c)) for c in kept)
+    return kept, before - after
@@ -1,3 +1,4 @@
+import json
 from .base import BaseCriticStrategy
 from typing import List, Dict, Any, Optional, AsyncGenerator
 import logging
@@ -16,10 +17,27 @@ class MergeStrategy(BaseCriticStrategy):
         if not self.cfg.context_system_prompt and not self.cfg.context_user_prompt:
             return None
 
+        local = self._trivial_context(messages)
+        if local is not None:
+            logger.debug("Trivial history, skipping context LLM call")
+            return local
+
+        # Only send what is new since the last summarized prefix
+        prefix_len, summary = (
+            self.context_cache.lookup(messages) if self.context_cache else (0, None)
+        )
+        history = json.dumps(messages[prefix_len:], ensure_ascii=False)
+        if summary is not None:
+            logger.debug("Reusing context summary for %s earlier messages", prefix_len)
+            history = (
+                f"Summary of the earlier conversation:\n{summary}\n\n"
+                f"Messages since then:\n{history}"
+            )
+
         sys_prompt = self.cfg.context_system_prompt or DEFAULT_CONTEXT_SYSTEM_PROMPT
         user_prompt = (
             self.cfg.context_user_prompt or DEFAULT_CONTEXT_USER_PROMPT
-        ).format(history=messages)
+        ).format(history=history)
 
         payload = {
             "model": self.cfg.model,
@@ -31,7 +49,12 @@ class MergeStrategy(BaseCriticStrategy):
         }
 
         resp = await self._call_endpoint(payload)
-        return resp["choices"][0]["message"]["content"] if resp else None
+        if not resp:
+            return None
+        context = resp["choices"][0]["message"]["content"]
+        if self.context_cache and context:
+            self.context_cache.store(messages, context)
+        return context
 
     async def run_critic(self, candidates: List[dict], context: Optional[str] = None) -> dict:
         logger.info(f"Running critic with {len(candidates)} candidates")
@@ -0,0 +1,100 @@
+import re
+import uuid
+from .merge import MergeStrategy
+from typing import List, Optional, AsyncGenerator
+import logging
+import metrics
+from utils import completion_to_chunks, format_response
+from .compaction import trim
+from .select_prompts import DEFAULT_SELECT_SYSTEM_PROMPT, DEFAULT_SELECT_USER_PROMPT
+
+logger = logging.getLogger(__name__)
+
+_INDEX = re.compile(r"\d+")
+
+class SelectStrategy(MergeStrategy):
+    """
+    Ask the critic for a short ranking of candidate numbers and return the
+    winning candidate as-is instead of a rewritten answer.
+
+    strategy_params:
+      system_prompt / user_prompt: ranking prompts (the critic's merge prompts are not used)
+      max_tokens: budget for the ranking reply (default 16; reasoning critics need far more)
+    """
+
+    answers_verbatim = True
+
+    def _ranking_payload(self, candidates: List[dict], context: Optional[str]) -> dict:
+        # Trimmed for the prompt only; the winner is returned untrimmed
+        contents = [
+            trim(c["choices"][0]["message"].get("content") or "", self.cfg.max_candidate_tokens)
+            for c in candidates
+        ]
+        answers = "\n\n".join(
+            f"=!=!= Answer #{i+1}:\n{content} =!=!="
+            for i, content in enumerate(contents)
+        )
+        params = self.cfg.strategy_params
+        user_prompt = (
+            params.get("user_prompt") or DEFAULT_SELECT_USER_PROMPT
+        ).format(context=context or "", answers=answers)
+        return {
+            "model": self.cfg.model,
+            "messages": [
+                {"role": "system", "content": params.get("system_prompt") or DEFAULT_SELECT_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0,
+            "max_tokens": int(self.cfg.strategy_params.get("max_tokens", 16)),
+        }
+
+    @staticmethod
+    def parse_ranking(text: Optional[str], count: int) -> List[int]:
+        """Zero-based candidate indices in ranked order, ignoring anything out of range"""
+        ranking = []
+        for match in _INDEX.findall(text or ""):
+            index = int(match) - 1
+            if 0 <= index < count and index not in ranking:
+                ranking.append(index)
+        return ranking
+
+    async def _select(self, candidates: List[dict], context: Optional[str]) -> dict:
+        logger.info("Ranking %s candidates", len(candidates))
+        winner, usage = 0, None
+        if len(candidates) > 1:
+            resp = await self._call_endpoint(self._ranking_payload(candidates, context))
+            reply = None
+            if resp:
+                usage = resp.get("usage")
+                reply = resp["choices"][0]["message"].get("content")
+            ranking = self.parse_ranking(reply, len(candidates))
+            if ranking:
+                winner = ranking[0]
+            else:
+                # No usable ranking is a critic failure, not a vote for the first answer
+                reason = "error" if resp is None else "empty" if not (reply or "").strip() else "unparseable"
+                metrics.SELECT_FALLBACKS.inc(reason)
+                logger.warning(
+                    "Critic ranking failed (%s, reply %r); falling back to the first candidate",
+                    reason, reply
+                )
+                # Id-less like every critic fallback, so it is neither cached nor scored by replay
+                return {**self._fallback_response(candidates[0]), "usage": usage}
+        logger.info("Selected answer #%s", winner + 1)
+        return format_response(candidates[winner]["choices"][0]["message"], usage)
+
+    async def run_critic(self, candidates: List[dict], context: Optional[str] = None) -> dict:
+        return await self._select(candidates, context)
+
+    async def run_critic_stream(
+        self,
+        candidates: List[dict],
+        context: Optional[str] = None,
+    ) -> AsyncGenerator[dict, None]:
+        resp = await self._select(candidates, context)
+        chunks = completion_to_chunks({"id": f"critic-fallback-{uuid.uuid4().hex}", **resp})
+        if resp.get("usage"):
+            # Report the ranking call's tokens like a streamed include_usage tail
+            chunks.append({**chunks[-1], "choices": [], "usage": resp["usage"]})
+        for chunk in chunks:
+            yield chunk
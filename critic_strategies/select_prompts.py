@@ -0,0 +1,11 @@
+DEFAULT_SELECT_SYSTEM_PROMPT = (
+    "You are an expert judge. Compare the candidate answers for correctness, "
+    "completeness and clarity, then rank them from best to worst. Reply with "
+    "the answer numbers only, separated by commas, and nothing else."
+)
+
+DEFAULT_SELECT_USER_PROMPT = (
+    "Context:\n{context}\n\n"
+    "Candidate answers (delimited by =!=!= ... =!=!=):\n{answers}\n\n"
+    "Ranking (numbers only, best first):"
+)
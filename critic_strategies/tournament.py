@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import uuid
+from typing import AsyncGenerator, Awaitable, List, Optional, Set
+from .merge import MergeStrategy
+from utils import completion_to_chunks
+
+logger = logging.getLogger(__name__)
+
+class TournamentStrategy(MergeStrategy):
+    """
+    Merge candidates in small parallel groups over log-depth rounds, then merge
+    the survivors in one final, streamed critic call.
+
+    strategy_params:
+      group_size: candidates per intermediate merge (default 2)
+      final_size: max answers handed to the final merge (default group_size)
+    """
+
+    @property
+    def group_size(self) -> int:
+        return max(2, int(self.cfg.strategy_params.get("group_size", 2)))
+
+    @property
+    def final_size(self) -> int:
+        return max(2, int(self.cfg.strategy_params.get("final_size", self.group_size)))
+
+    async def _merge_group(self, group: List[dict], context: Optional[str]) -> dict:
+        if len(group) == 1:
+            return group[0]
+        return await MergeStrategy.run_critic(self, group, context)
+
+    async def _reduce(self, items: List[dict], context: Optional[str]) -> List[dict]:
+        """Run parallel merge rounds until at most `final_size` answers remain"""
+        size = self.group_size
+        round_no = 0
+        while len(items) > self.final_size:
+            round_no += 1
+            groups = [items[i:i + size] for i in range(0, len(items), size)]
+            logger.info("Tournament round %s: %s answers in %s groups", round_no, len(items), len(groups))
+            items = list(await asyncio.gather(*(self._merge_group(g, context) for g in groups)))
+        return items
+
+    async def run_critic(self, candidates: List[dict], context: Optional[str] = None) -> dict:
+        items = await self._reduce(candidates, context)
+        return await self._merge_group(items, context)
+
+    async def run_critic_stream(
+        self,
+        candidates: List[dict],
+        context: Optional[str] = None,
+    ) -> AsyncGenerator[dict, None]:
+        items = await self._reduce(candidates, context)
+        async for chunk in self._stream_final(items, context):
+            yield chunk
+
+    async def _stream_final(self, items: List[dict], context: Optional[str]) -> AsyncGenerator[dict, None]:
+        if len(items) == 1:
+            item = items[0]
+            if not item.get("id"):
+                # A failed merge echoes a candidate: tag it like any critic fallback so it is not cached
+                item = {**item, "id": f"critic-fallback-{uuid.uuid4().hex}"}
+            for chunk in completion_to_chunks(item):
+                yield chunk
+            return
+        async for chunk in MergeStrategy.run_critic_stream(self, items, context):
+            yield chunk
+
+    def open_session(self, context: Awaitable[Optional[str]], expected: int) -> Optional["TournamentSession"]:
+        return TournamentSession(self, context, expected)
+
+class TournamentSession:
+    """Per-request state that merges early groups while other candidates are still arriving"""
+
+    def __init__(self, strategy: TournamentStrategy, context: Awaitable[Optional[str]], expected: int):
+        self.strategy = strategy
+        self.context = context
+        # Early merges must leave the final round something to stream
+        self.early = expected > strategy.final_size
+        self.leaves: List[dict] = []
+        self.merged: List[dict] = []
+        self.tasks: Set[asyncio.Task] = set()
+        self.seen: Set[int] = set()
+        self.frozen = False
+        self.closed = False
+
+    def on_task_done(self, task: asyncio.Task) -> None:
+        if self.frozen:
+            return
+        if not task.cancelled() and task.exception() is None and task.result() is not None:
+            self.add(task.result())
+
+    def freeze(self) -> None:
+        """
+        Stop taking candidates as they arrive, called at quorum: stragglers that
+        finish later are left out, so the merged set matches the request's candidates.
+        """
+        self.frozen = True
+
+    def add(self, candidate: dict) -> None:
+        if self.closed or id(candidate) in self.seen:
+            return
+        self.seen.add(id(candidate))
+        self.leaves.append(candidate)
+        size = self.strategy.group_size
+        if self.early and len(self.leaves) >= size:
+            group, self.leaves = self.leaves[:size], self.leaves[size:]
+            logger.info("Tournament: merging an early group of %s", len(group))
+            task = asyncio.create_task(self._merge(group))
+            self.tasks.add(task)
+
+    async def _merge(self, group: List[dict]) -> None:
+        self.merged.append(await self.strategy._merge_group(group, await self._context()))
+
+    async def _context(self) -> Optional[str]:
+        if getattr(self.context, "cancelled", lambda: False)():
+            return None  # Context skipped (e.g. critic cache hit)
+        return await asyncio.shield(self.context)
+
+    async def _finish(self, candidates: List[dict]) -> List[dict]:
+        for candidate in candidates:
+            self.add(candidate)
+        self.closed = True
+        await asyncio.gather(*self.tasks)
+        return await self.strategy._reduce(self.merged + self.leaves, await self._context())
+
+    async def run_critic(self, candidates: List[dict]) -> dict:
+        items = await self._finish(candidates)
+        return await self.strategy._merge_group(items, await self._context())
+
+    async def run_critic_stream(self, candidates: List[dict]) -> AsyncGenerator[dict, None]:
+        items = await self._finish(candidates)
+        async for chunk in self.strategy._stream_final(items, await self._context()):
+            yield chunk
+
+    def cancel(self) -> None:
+        self.closed = True
+        for task in self.tasks:
+            task.cancel()
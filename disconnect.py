@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Optional, TypeVar
+from fastapi import Request
+import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready"""
+
+async def _gone(request: Request) -> bool:
+    if await request.is_disconnected():
+        logger.info("Client disconnected, cancelling request")
+        metrics.DISCONNECTS.inc()
+        return True
+    return False
+
+async def run_until_disconnected(request: Request, awaitable: Awaitable[T], interval: float) -> T:
+    """Await `awaitable`, cancelling it and raising ClientDisconnected if the client leaves"""
+    task = asyncio.ensure_future(awaitable)
+    if not interval:
+        return await task
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                return task.result()
+            if await _gone(request):
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def relay_until_disconnected(
+    request: Request, source: AsyncIterator[T], interval: float
+) -> AsyncIterator[T]:
+    """
+    Relay `source` while one watcher task polls for a disconnect; if the client
+    leaves, the pending read is cancelled so upstream work unwinds through the
+    generator chain. Items are read directly, with no per-item task or wait.
+    """
+    if not interval:
+        async for item in source:
+            yield item
+        return
+    reader: Optional[asyncio.Task] = None  # Set only while suspended on the source
+    gone = False
+
+    async def watch() -> None:
+        nonlocal gone
+        while True:
+            await asyncio.sleep(interval)
+            if await _gone(request):
+                gone = True
+                if reader is not None:
+                    reader.cancel()
+                return
+
+    watcher = asyncio.create_task(watch())
+    iterator = source.__aiter__()
+    try:
+        while not gone:
+            reader = asyncio.current_task()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            except asyncio.CancelledError:
+                if not gone:
+                    raise
+                # The watcher's cancel, not the caller's: end the relay quietly
+                uncancel = getattr(reader, "uncancel", None)
+                if uncancel:
+                    uncancel()
+                return
+            finally:
+                reader = None
+            yield item
+    finally:
+        watcher.cancel()
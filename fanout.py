@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Strong references to stragglers left running after quorum was reached
+_background_tasks: Set[asyncio.Task] = set()
+
+class NoCandidates(Exception):
+    """Raised when every model was skipped by its circuit or failed before quorum"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+class CandidateAssembler:
+    """Rebuild a chat.completion body from streamed chunks"""
+
+    def __init__(self):
+        self.id: Optional[str] = None
+        self.model: Optional[str] = None
+        self.content: List[str] = []
+        self.reasoning: List[str] = []
+        self.tool_calls: Dict[int, dict] = {}
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[dict] = None
+
+    def add(self, chunk: dict) -> None:
+        self.id = self.id or chunk.get("id")
+        self.model = self.model or chunk.get("model")
+        if chunk.get("usage"):
+            self.usage = chunk["usage"]
+        for choice in chunk.get("choices") or []:
+            if choice.get("index", 0) != 0:
+                continue
+            delta = choice.get("delta") or {}
+            if delta.get("content"):
+                self.content.append(delta["content"])
+            reasoning = delta.get("reasoning") or delta.get("reasoning_content")
+            if reasoning:
+                self.reasoning.append(reasoning)
+            for call in delta.get("tool_calls") or []:
+                slot = self.tool_calls.setdefault(
+                    call.get("index", 0),
+                    {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
+                )
+                slot["id"] = slot["id"] or call.get("id")
+                fn = call.get("function") or {}
+                slot["function"]["name"] += fn.get("name") or ""
+                slot["function"]["arguments"] += fn.get("arguments") or ""
+            if choice.get("finish_reason"):
+                self.finish_reason = choice["finish_reason"]
+
+    def body(self) -> dict:
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(self.content)}
+        if self.reasoning:
+            message["reasoning"] = "".join(self.reasoning)
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[i] for i in sorted(self.tool_calls)]
+        return {
+            "id": self.id,
+            "object": "chat.completion",
+            "model": self.model,
+            "choices": [{"index": 0, "message": message, "finish_reason": self.finish_reason}],
+            "usage": self.usage,
+        }
+
+def _succeeded(task: asyncio.Task) -> bool:
+    return not task.cancelled() and task.exception() is None and task.result() is not None
+
+async def wait_for_quorum(
+    tasks: Iterable[asyncio.Task],
+    min_candidates: Optional[int] = None,
+    soft_deadline: Optional[float] = None,
+) -> Set[asyncio.Task]:
+    """
+    Wait for model tasks until the critic can start and return the still-pending ones.
+
+    Tasks resolve to a candidate body, or None when the model failed. Waiting stops
+    once `min_candidates` tasks succeeded (all tasks when unset), or once
+    `soft_deadline` seconds have elapsed and at least one candidate has arrived.
+    """
+    pending = set(tasks)
+    target = min(min_candidates or len(pending), len(pending))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + soft_deadline if soft_deadline is not None else None
+    succeeded = 0
+
+    while pending and succeeded < target:
+        timeout = None
+        if deadline is not None:
+            timeout = max(deadline - loop.time(), 0.0)
+            if timeout == 0.0 and succeeded:
+                logger.info("Soft deadline reached with %s candidates", succeeded)
+                break
+            if timeout == 0.0:
+                timeout = None  # Past the deadline: take the first success
+        done, pending = await asyncio.wait(
+            pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+        succeeded += sum(1 for t in done if _succeeded(t))
+
+    return pending
+
+def release_stragglers(
+    pending: Set[asyncio.Task], policy: str, background: Optional[Set[asyncio.Task]] = None
+) -> None:
+    """
+    Cancel tasks still running after quorum, or let them finish in the background,
+    held in `background` (e.g. the owning config generation's set) if given.
+    """
+    if not pending:
+        return
+    if policy == "background":
+        logger.info("Leaving %s straggler(s) running in background", len(pending))
+        owner = _background_tasks if background is None else background
+        for task in pending:
+            owner.add(task)
+            task.add_done_callback(owner.discard)
+        return
+    logger.info("Cancelling %s straggler(s)", len(pending))
+    for task in pending:
+        task.cancel()
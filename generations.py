@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+from operator import attrgetter
+from typing import Dict, Optional, Set
+from config import AppConfig, load_config
+from critic import CriticService
+from hedging import HedgeBudget
+from limits import UpstreamLimits
+from pools import EndpointPools
+
+logger = logging.getLogger(__name__)
+
+# Settings whose state lives for the whole process; changing them needs a restart.
+# Dotted entries name one setting of a section whose other settings reload.
+RESTART_FIELDS = (
+    "cache", "admission", "breaker", "retry.budget_ratio", "retry.budget_min_per_second",
+    "retry.budget_max_tokens", "trace", "spans.directory", "record", "coalesce_requests",
+    "reload_interval", "shared_state_path"
+)
+
+_closing: Set[asyncio.Task] = set()
+
+def _close_later(pools: EndpointPools) -> None:
+    """Close pools from sync code (a failed constructor)"""
+    try:
+        task = asyncio.get_running_loop().create_task(pools.aclose())
+    except RuntimeError:  # No loop yet: no connection was opened either
+        return
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+class Generation:
+    """Everything built from one config. Requests pin the generation they started on."""
+
+    BACKGROUND_GRACE = 30.0  # Seconds stragglers may keep running after a retired generation drains
+
+    def __init__(self, number: int, config: AppConfig, shared):
+        self._shared = shared
+        self.number = number
+        self.config = config
+        self.pools = EndpointPools(config)
+        try:
+            self.limits = UpstreamLimits(config, getattr(shared, "store", None))
+            self.critic = CriticService(config, self.pools, self.limits)
+            self.hedge_budgets = {
+                (m.endpoint, m.model): HedgeBudget(m.hedge.max_rate) for m in config.models if m.hedge
+            }
+        except BaseException:
+            # e.g. an unknown critic strategy: do not leak the pools already opened
+            _close_later(self.pools)
+            raise
+        # Stragglers left running after quorum, still using this generation's pools
+        self.background: Set[asyncio.Task] = set()
+        self.active = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+    def __getattr__(self, name):
+        # Process-wide state (cache, breakers, latency, ...) is shared by all generations
+        return getattr(self._shared, name)
+
+    def enter(self) -> "Generation":
+        self.active += 1
+        self._drained.clear()
+        return self
+
+    def leave(self) -> None:
+        self.active -= 1
+        if self.active == 0:
+            self._drained.set()
+
+    async def retire(self) -> None:
+        """Close this generation's pools once its in-flight requests and stragglers finish"""
+        await self._drained.wait()
+        if self.background:
+            _, late = await asyncio.wait(set(self.background), timeout=self.BACKGROUND_GRACE)
+            for task in late:
+                task.cancel()
+            await asyncio.gather(*late, return_exceptions=True)
+        await self.pools.aclose()
+        logger.info("Config generation %s drained and closed", self.number)
+
+class GenerationManager:
+    """Hot config reload: builds a new generation and drains the old one"""
+
+    def __init__(self, shared, config: AppConfig, path: Optional[str] = None):
+        self.shared = shared
+        self.path = path or os.getenv("MOM_CONFIG", "config.yaml")
+        self.current = Generation(1, config, shared)
+        self._lock = asyncio.Lock()
+        self._retiring: Dict[Generation, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._seen_seq = 0  # Last shared reload request this worker has applied
+        self._publish()
+
+    def _publish(self) -> None:
+        """Expose the current generation on app.state for readers outside a request"""
+        gen = self.current
+        self.shared.config = gen.config
+        self.shared.pools = gen.pools
+        self.shared.critic = gen.critic
+        self.shared.limits = gen.limits
+        self.shared.hedge_budgets = gen.hedge_budgets
+
+    def acquire(self) -> Generation:
+        return self.current.enter()
+
+    async def reload(self, broadcast: bool = True) -> Generation:
+        """
+        Load the config file and swap it in; raises (keeping the old generation) if
+        invalid. With a shared store, a successful reload is announced to the other
+        workers unless it was itself triggered by such an announcement.
+        """
+        gen = await self._swap()
+        store = getattr(self.shared, "store", None)
+        if broadcast and store:
+            self._seen_seq = await asyncio.to_thread(store.bump_reload)
+        return gen
+
+    async def _swap(self) -> Generation:
+        async with self._lock:
+            config = load_config(self.path)
+            old = self.current
+            for field in RESTART_FIELDS:
+                if attrgetter(field)(config) != attrgetter(field)(old.config):
+                    logger.warning(f"Config '{field}' changed; it takes effect after a restart")
+            gen = Generation(old.number + 1, config, self.shared)
+            if config.health.warm_connections:
+                await gen.pools.warm(config.health)  # Warm before it takes traffic
+            self.current = gen
+            self._publish()
+            task = asyncio.create_task(old.retire())
+            self._retiring[old] = task
+            task.add_done_callback(lambda _: self._retiring.pop(old, None))
+            logger.info(
+                "Loaded config generation %s; generation %s draining %s requests",
+                self.current.number, old.number, old.active
+            )
+            return self.current
+
+    def trigger(self, broadcast: bool = True) -> None:
+        """Reload in the background (signal handlers, watchers), logging failures"""
+        async def run():
+            try:
+                await self.reload(broadcast)
+            except Exception as exc:
+                logger.error(f"Config reload failed, keeping generation {self.current.number}: {exc}")
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def watch(self, interval: float) -> None:
+        """Poll the config file and reload when its mtime changes"""
+        async def run():
+            last = os.stat(self.path).st_mtime
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    mtime = os.stat(self.path).st_mtime
+                except OSError as exc:
+                    logger.warning(f"Cannot stat config file: {exc}")
+                    continue
+                if mtime != last:
+                    last = mtime
+                    logger.info("Config file changed, reloading")
+                    self.trigger(broadcast=False)  # Every worker watches the file itself
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def follow(self, store, interval: float) -> None:
+        """Apply reloads requested by other workers through the shared store"""
+        async def run():
+            self._seen_seq = await asyncio.to_thread(store.reload_seq)
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    seq = await asyncio.to_thread(store.reload_seq)
+                except Exception as exc:
+                    logger.warning(f"Cannot read shared reload state: {exc}")
+                    continue
+                if seq != self._seen_seq:
+                    self._seen_seq = seq
+                    logger.info("Reload requested by another worker")
+                    self.trigger(broadcast=False)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        for gen, task in list(self._retiring.items()):
+            task.cancel()
+            await gen.pools.aclose()
+        for task in list(self.current.background):
+            task.cancel()
+        await self.current.pools.aclose()
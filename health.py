@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from generations import GenerationManager
+
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """Startup warm-up plus cached per-endpoint reachability for /readyz"""
+
+    IDLE_RECHECK = 30.0  # Seconds between config checks while probing is off
+
+    def __init__(self, generations: GenerationManager):
+        self.generations = generations
+        self.endpoints: Dict[str, dict] = {}
+        self.warm = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        cfg = self.generations.current.config.health
+        probed = False
+        try:
+            if cfg.warm_connections:
+                self.endpoints = await self.generations.current.pools.warm(cfg)
+                probed = True
+        except Exception as exc:  # Warm-up is best effort
+            logger.warning(f"Connection warm-up failed: {exc}")
+        self.warm = True
+        logger.info("Gateway ready")
+        while True:
+            # Re-read each round so reloads can enable, change or disable probing
+            cfg = self.generations.current.config.health
+            if not cfg.probe_interval:
+                await asyncio.sleep(self.IDLE_RECHECK)
+                probed = False
+                continue
+            if probed:
+                await asyncio.sleep(cfg.probe_interval)
+            probed = True
+            try:
+                self.endpoints = await self.generations.current.pools.probe_all(cfg)
+            except Exception as exc:
+                logger.warning(f"Endpoint probe failed: {exc}")
+            for name, result in self.endpoints.items():
+                if not result["reachable"]:
+                    logger.warning("Endpoint %s unreachable: %s", name, result.get("error") or result.get("status"))
+
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            "ready": self.warm,
+            "generation": self.generations.current.number,
+            "endpoints": self.endpoints,
+        }
+
+    async def aclose(self) -> None:
+        if self._task:
+            self._task.cancel()
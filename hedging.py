@@ -0,0 +1,111 @@
+import asyncio
+import bisect
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Log-spaced upper bounds in seconds, 10ms .. ~20min
+LATENCY_BUCKETS: List[float] = [round(0.01 * 1.25 ** i, 4) for i in range(53)]
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; recording is a bisect and two increments"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+        return self.buckets[-1]
+
+class LatencyTracker:
+    """Per-(endpoint, model) latency histograms kept in memory"""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def observe(self, endpoint: str, model: str, seconds: float) -> None:
+        hist = self.histograms.get((endpoint, model))
+        if hist is None:
+            hist = self.histograms[(endpoint, model)] = LatencyHistogram()
+        hist.observe(seconds)
+
+    def quantile(self, endpoint: str, model: str, q: float, min_samples: int = 1) -> Optional[float]:
+        hist = self.histograms.get((endpoint, model))
+        if hist is None or hist.count < min_samples:
+            return None
+        return hist.quantile(q)
+
+class HedgeBudget:
+    """Caps hedged requests to a fraction of all requests for one model"""
+
+    def __init__(self, max_rate: float, window: int = 1000):
+        self.max_rate = max_rate
+        self.window = window
+        self.requests = 0
+        self.hedges = 0
+
+    def record_request(self) -> None:
+        self.requests += 1
+        if self.requests > self.window:
+            # Decay so the rate reflects recent traffic
+            self.requests //= 2
+            self.hedges //= 2
+
+    def try_hedge(self) -> bool:
+        if self.hedges + 1 > self.max_rate * self.requests:
+            return False
+        self.hedges += 1
+        return True
+
+async def race_hedged(
+    primary: Callable[[], Awaitable[Tuple[int, Optional[dict]]]],
+    hedge: Callable[[], Awaitable[Tuple[int, Optional[dict]]]],
+    delay: float,
+    budget: HedgeBudget,
+    label: str = "",
+) -> Tuple[int, Optional[dict]]:
+    """
+    Run `primary`; if it has not answered after `delay` seconds and the budget
+    allows, start `hedge` and return whichever succeeds first, cancelling the other.
+    """
+    first = asyncio.create_task(primary())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or not budget.try_hedge():
+            return await first
+
+        logger.info("Hedging %s after %.2fs", label, delay)
+        tasks.append(asyncio.create_task(hedge()))
+        pending = set(tasks)
+        outcome = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result()[0] == 200:
+                    return task.result()
+                outcome = task
+        # Both failed: surface the last failure like an unhedged call would
+        return outcome.result()
+    finally:
+        # Also runs when the caller is cancelled (timeout, disconnect, straggler)
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import math
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+from config import AdmissionConfig, AppConfig
+from shared_state import SharedStore
+
+logger = logging.getLogger(__name__)
+
+class Overloaded(Exception):
+    """Raised when the gateway queue is full or the wait exceeded its limit"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Classic token bucket; `acquire` waits for a token in FIFO order. With a
+    shared store the bucket state lives there and is drawn from by every worker.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[int] = None,
+        store: Optional[SharedStore] = None,
+        key: str = "",
+    ):
+        self.rate = rate
+        self.capacity = float(burst or max(1, math.ceil(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.store = store
+        self.key = key
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            if self.store:
+                while True:
+                    wait = await asyncio.to_thread(
+                        self.store.take_token, self.key, self.rate, self.capacity
+                    )
+                    if wait <= 0:
+                        return
+                    await asyncio.sleep(wait)
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+class Limiter:
+    """Optional concurrency cap (per worker) plus optional rate limit for one upstream target"""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int],
+        rate: Optional[float],
+        burst: Optional[int],
+        store: Optional[SharedStore] = None,
+        key: str = "",
+    ):
+        self.semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.bucket = TokenBucket(rate, burst, store, key) if rate else None
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[None]:
+        if self.bucket:
+            await self.bucket.acquire()
+        if self.semaphore:
+            async with self.semaphore:
+                yield
+        else:
+            yield
+
+class UpstreamLimits:
+    """Per-endpoint and per-(endpoint, model) limiters built from config"""
+
+    def __init__(self, config: AppConfig, store: Optional[SharedStore] = None):
+        self._endpoints: Dict[str, Limiter] = {
+            e.name: Limiter(e.max_concurrency, e.rate_limit, e.rate_burst, store, e.name)
+            for e in config.endpoints
+            if e.max_concurrency or e.rate_limit
+        }
+        self._models: Dict[Tuple[str, str], Limiter] = {
+            (m.endpoint, m.model): Limiter(
+                m.max_concurrency, m.rate_limit, m.rate_burst, store, f"{m.endpoint}|{m.model}"
+            )
+            for m in config.models
+            if m.max_concurrency or m.rate_limit
+        }
+
+    @asynccontextmanager
+    async def hold(self, endpoint: str, model: Optional[str] = None) -> AsyncIterator[None]:
+        async with AsyncExitStack() as stack:
+            limiter = self._models.get((endpoint, model)) if model else None
+            if limiter:
+                await stack.enter_async_context(limiter.hold())
+            limiter = self._endpoints.get(endpoint)
+            if limiter:
+                await stack.enter_async_context(limiter.hold())
+            yield
+
+class AdmissionController:
+    """Gateway-wide in-flight cap with a bounded, time-limited wait queue"""
+
+    def __init__(self, cfg: AdmissionConfig):
+        self.max_queue = cfg.max_queue
+        self.max_wait = cfg.max_queue_wait
+        self.retry_after = max(1, math.ceil(cfg.max_queue_wait))
+        self.inflight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(cfg.max_inflight) if cfg.max_inflight else None
+
+    async def acquire(self) -> None:
+        if self._semaphore and not self._semaphore.locked():
+            # Free permit: taken without suspending, so a same-tick burst cannot overshoot
+            await self._semaphore.acquire()
+        elif self._semaphore:
+            if self.waiting >= self.max_queue:
+                raise Overloaded("Gateway queue is full", self.retry_after)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                raise Overloaded("Timed out waiting in gateway queue", self.retry_after)
+            finally:
+                self.waiting -= 1
+        self.inflight += 1
+
+    def release(self) -> None:
+        self.inflight -= 1
+        if self._semaphore:
+            self._semaphore.release()
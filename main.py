@@ -1,10 +1,10 @@
 import argparse
 import logging
+import os
 from pathlib import Path
 import uvicorn
 
-import app
-from utils import request_id_ctx
+from utils import configure_logging
 
 logger = logging.getLogger(__name__)
 
@@ -13,43 +13,53 @@ if __name__ == "__main__":
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
     parser.add_argument(
         "--debug-requests", action="store_true",
-        help="Save human-readable trace of each request to ./debug-requests/"
+        help="Save a compressed JSONL trace of each request to ./debug-requests/"
+    )
+    parser.add_argument(
+        "--debug-requests-sample", type=float, default=None,
+        help="Fraction of requests to trace (overrides trace.sample_rate in config)"
     )
     parser.add_argument("--port", type=int, default=8000, help="Listen port")
+    parser.add_argument("--config", default=None, help="Config file (default: $MOM_CONFIG or config.yaml)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument(
+        "--loop", choices=["auto", "asyncio", "uvloop"], default="auto",
+        help="Event loop implementation (auto uses uvloop when installed)"
+    )
     parser.add_argument(
         "--workaround-reasoning-as-think", action="store_true",
         help="Enable streaming reasoning using inside content (<think>...</think> tags)"
     )
     args = parser.parse_args()
 
-    log_level = logging.DEBUG if args.debug else logging.INFO
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s [%(levelname)s] [req:%(request_id)s] %(name)s: %(message)s"
-    )
-
-    # Override global LogRecord factory to inject request_id
-    _old_factory = logging.getLogRecordFactory()
-
-    def _record_factory(*args, **kwargs):
-        record = _old_factory(*args, **kwargs)
-        # Default to "-" if contextvar is unset (safe for startup/background)
-        record.request_id = request_id_ctx.get("-")
-        return record
-
-    logging.setLogRecordFactory(_record_factory)
+    # Worker processes import the app fresh, so every switch travels via the environment
+    os.environ["MOM_LOG_LEVEL"] = "DEBUG" if args.debug else "INFO"
+    os.environ["MOM_WORKERS"] = str(args.workers)
+    configure_logging(os.environ["MOM_LOG_LEVEL"])
 
     if args.debug:
         logger.debug("Debug logging enabled")
 
+    if args.config:
+        os.environ["MOM_CONFIG"] = args.config
+
     if args.debug_requests:
-        app.DEBUG_REQUESTS_DIR = Path("debug-requests")
-        app.DEBUG_REQUESTS_DIR.mkdir(exist_ok=True, parents=True)
-        logger.info("Per-request debug traces will be written to %s", app.DEBUG_REQUESTS_DIR)
+        debug_dir = Path("debug-requests")
+        os.environ["MOM_DEBUG_REQUESTS_DIR"] = str(debug_dir)
+        if args.debug_requests_sample is not None:
+            os.environ["MOM_DEBUG_REQUESTS_SAMPLE"] = str(args.debug_requests_sample)
+        logger.info("Per-request debug traces will be written to %s", debug_dir)
 
     if args.workaround_reasoning_as_think:
-        import app as app_module
-        app_module.REASONING_FILTER_ENABLED = True
+        os.environ["MOM_REASONING_AS_THINK"] = "1"
         logger.info("Reasoning filter enabled: streaming output will use <think>...</think> tags.")
 
-    uvicorn.run(app.app, host="0.0.0.0", port=args.port, reload=False)
+    uvicorn.run(
+        "app:create_app",
+        factory=True,
+        host="0.0.0.0",
+        port=args.port,
+        workers=args.workers,
+        loop=args.loop,
+        reload=False,
+    )
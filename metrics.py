@@ -0,0 +1,113 @@
+from typing import Dict, Iterable, List, Tuple
+from hedging import LatencyHistogram, LatencyTracker
+
+# Single event loop per process: plain dict/int updates need no locking
+
+Labels = Tuple[str, ...]
+
+def _fmt_labels(names: Iterable[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, value: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.series: Dict[Labels, LatencyHistogram] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        hist = self.series.get(labels)
+        if hist is None:
+            hist = self.series[labels] = LatencyHistogram()
+        hist.observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, hist in self.series.items():
+            lines.extend(render_histogram(self.name, self.labelnames, labels, hist))
+        return lines
+
+def render_histogram(name: str, labelnames: Labels, labels: Labels, hist: LatencyHistogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(hist.buckets, hist.counts):
+        cumulative += count
+        le = _fmt_labels(labelnames, labels, 'le="%s"' % bound)
+        lines.append(f"{name}_bucket{le} {cumulative}")
+    le = _fmt_labels(labelnames, labels, 'le="+Inf"')
+    lines.append(f"{name}_bucket{le} {hist.count}")
+    lines.append(f"{name}_sum{_fmt_labels(labelnames, labels)} {hist.total}")
+    lines.append(f"{name}_count{_fmt_labels(labelnames, labels)} {hist.count}")
+    return lines
+
+CANDIDATES = Counter(
+    "mom_candidates_total", "Candidate calls by outcome", ("endpoint", "model", "status")
+)
+UPSTREAM_TOKENS = Counter(
+    "mom_upstream_tokens_total", "Tokens reported by candidate usage blocks",
+    ("endpoint", "model", "kind")
+)
+CRITIC_TTFB = Histogram("mom_critic_ttfb_seconds", "Time to first critic stream chunk")
+CRITIC_SECONDS = Histogram("mom_critic_seconds", "Critic wall time", ("mode",))
+CONTEXT_SECONDS = Histogram("mom_context_seconds", "Context composition time")
+FANOUT_SECONDS = Histogram("mom_fanout_seconds", "Fan-out wall time until quorum")
+REJECTED = Counter("mom_rejected_requests_total", "Requests rejected with 429")
+CONSENSUS = Counter("mom_consensus_total", "Requests answered by candidate consensus")
+DISCONNECTS = Counter("mom_client_disconnects_total", "Requests cancelled after the client left")
+CRITIC_TOKENS_SAVED = Counter(
+    "mom_critic_tokens_saved_total", "Estimated critic prompt tokens removed by compaction"
+)
+SELECT_FALLBACKS = Counter(
+    "mom_select_fallbacks_total", "Select rankings that were missing or unusable", ("reason",)
+)
+
+def record_usage(endpoint: str, model: str, usage: dict) -> None:
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(kind)
+        if isinstance(value, (int, float)):
+            UPSTREAM_TOKENS.inc(endpoint, model, kind, value=value)
+
+def render(state) -> str:
+    """Prometheus text exposition of all gateway metrics"""
+    lines: List[str] = []
+    for metric in (CANDIDATES, UPSTREAM_TOKENS, REJECTED, CONSENSUS, DISCONNECTS, CRITIC_TOKENS_SAVED,
+                   SELECT_FALLBACKS, CRITIC_TTFB, CRITIC_SECONDS, CONTEXT_SECONDS, FANOUT_SECONDS):
+        lines.extend(metric.render())
+
+    latency: LatencyTracker = state.latency
+    name = "mom_upstream_latency_seconds"
+    lines.append(f"# HELP {name} Successful upstream call latency")
+    lines.append(f"# TYPE {name} histogram")
+    for (endpoint, model), hist in latency.histograms.items():
+        lines.extend(render_histogram(name, ("endpoint", "model"), (endpoint, model), hist))
+
+    admission = state.admission
+    lines.append("# HELP mom_inflight_requests Requests currently being processed")
+    lines.append("# TYPE mom_inflight_requests gauge")
+    lines.append(f"mom_inflight_requests {admission.inflight}")
+    lines.append("# HELP mom_queued_requests Requests waiting for an admission slot")
+    lines.append("# TYPE mom_queued_requests gauge")
+    lines.append(f"mom_queued_requests {admission.waiting}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,89 @@
+import asyncio
+import importlib.util
+import logging
+import time
+import httpx
+from typing import Dict
+from config import AppConfig, EndpointConfig, HealthConfig
+
+logger = logging.getLogger(__name__)
+
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+class EndpointPools:
+    """One tuned HTTP client (connection pool) per configured endpoint"""
+
+    def __init__(self, config: AppConfig):
+        self._endpoints = config.endpoints
+        self._clients: Dict[str, httpx.AsyncClient] = {
+            endpoint.name: self._build(endpoint, config.timeout)
+            for endpoint in config.endpoints
+        }
+
+    @staticmethod
+    def _build(endpoint: EndpointConfig, default_timeout: float) -> httpx.AsyncClient:
+        http2 = endpoint.http2
+        if http2 and not _HTTP2_AVAILABLE:
+            logger.warning(
+                "HTTP/2 requested for endpoint %s but `h2` is not installed; using HTTP/1.1",
+                endpoint.name
+            )
+            http2 = False
+
+        transport = httpx.AsyncHTTPTransport(
+            retries=2,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=endpoint.max_connections,
+                max_keepalive_connections=endpoint.max_keepalive_connections,
+                keepalive_expiry=endpoint.keepalive_expiry,
+            ),
+        )
+        timeout = httpx.Timeout(
+            endpoint.read_timeout or default_timeout,
+            connect=endpoint.connect_timeout,
+        )
+        return httpx.AsyncClient(timeout=timeout, transport=transport)
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        return self._clients[name]
+
+    async def probe(self, endpoint: EndpointConfig, cfg: HealthConfig) -> dict:
+        """One authenticated GET; any answer below 500 means the endpoint is reachable"""
+        url = f"{endpoint.base_url.rstrip('/')}{cfg.probe_path}"
+        started = time.monotonic()
+        try:
+            resp = await self.get(endpoint.name).get(
+                url,
+                headers={"Authorization": f"Bearer {endpoint.api_key}"},
+                timeout=cfg.probe_timeout,
+            )
+        except Exception as exc:
+            return {"reachable": False, "error": str(exc) or type(exc).__name__, "checked_at": time.time()}
+        return {
+            "reachable": resp.status_code < 500,
+            "status": resp.status_code,
+            "latency": round(time.monotonic() - started, 4),
+            "checked_at": time.time(),
+        }
+
+    async def probe_all(self, cfg: HealthConfig) -> Dict[str, dict]:
+        results = await asyncio.gather(*(self.probe(e, cfg) for e in self._endpoints))
+        return {e.name: result for e, result in zip(self._endpoints, results)}
+
+    async def warm(self, cfg: HealthConfig) -> Dict[str, dict]:
+        """Open keepalive connections (TCP + TLS) with concurrent probes to every endpoint"""
+
+        async def warm_endpoint(endpoint: EndpointConfig) -> dict:
+            count = max(1, min(cfg.warm_connections, endpoint.max_keepalive_connections))
+            results = await asyncio.gather(*(self.probe(endpoint, cfg) for _ in range(count)))
+            reachable = [r for r in results if r["reachable"]]
+            logger.info("Warmed %s of %s connections to %s", len(reachable), count, endpoint.name)
+            return reachable[0] if reachable else results[0]
+
+        results = await asyncio.gather(*(warm_endpoint(e) for e in self._endpoints))
+        return {e.name: result for e, result in zip(self._endpoints, results)}
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
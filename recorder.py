@@ -0,0 +1,82 @@
+import random
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional
+import codec
+from config import RecordConfig
+from shared_state import connect
+from trace_writer import BackgroundWriter
+
+class RecordStore:
+    """Append-only SQLite store of fan-out results, payloads zlib-compressed"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, request_id TEXT NOT NULL, "
+                "created REAL NOT NULL, candidates INTEGER NOT NULL, data BLOB NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS records_created ON records (created)")
+
+    def append(self, records: List[dict]) -> None:
+        rows = [
+            (r["request_id"], r["created"], len(r["candidates"]), zlib.compress(codec.dumpb(r)))
+            for r in records
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO records (request_id, created, candidates, data) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def read(self, limit: Optional[int] = None, min_candidates: int = 1) -> Iterator[dict]:
+        """Records oldest first, each with its row id"""
+        query = "SELECT id, data FROM records WHERE candidates >= ? ORDER BY id"
+        params: tuple = (min_candidates,)
+        if limit:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        for row_id, data in rows:
+            yield {"id": row_id, **codec.loads(zlib.decompress(data))}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+class CandidateRecorder(BackgroundWriter):
+    """Queue fan-out results off the request path and append them to a RecordStore in batches"""
+
+    def __init__(self, cfg: RecordConfig):
+        # Appends whatever is queued at once: no flush delay, one batch can hold the whole backlog
+        super().__init__(cfg.queue_size, cfg.queue_size, 0.0)
+        self.cfg = cfg
+        self.store = RecordStore(cfg.path)
+
+    def submit(self, request_id: str, messages: list, candidates: List[dict],
+               tasks_info: List[dict], context: Optional[str], timings: dict) -> None:
+        if self.cfg.sample_rate < 1.0 and random.random() >= self.cfg.sample_rate:
+            return
+        super().submit({
+            "request_id": request_id,
+            "created": time.time(),
+            "messages": messages,
+            "candidates": candidates,
+            "calls": [
+                {k: info.get(k) for k in ("endpoint", "model", "status", "ttfb", "elapsed")}
+                for info in tasks_info
+            ],
+            "context": context,
+            "timings": timings,
+        })
+
+    def _write_batch(self, batch: List[dict]) -> None:
+        self.store.append(batch)
+
+    async def aclose(self) -> None:
+        await super().aclose()
+        self.store.close()
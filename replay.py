@@ -0,0 +1,156 @@
+"""
+Rerun only the critic stage against fan-outs recorded by the gateway (`record.path`).
+
+    python replay.py recordings.db --strategy merge --strategy select \
+        --strategy tournament:group_size=3 --limit 200 --concurrency 8 --diffs diffs.jsonl
+
+Every strategy spec is `name[:key=value,...]`; the params override the config's
+`critic.strategy_params`. The first spec is the baseline. The JSON report gives
+per-strategy critic latency, output tokens and mean similarity of each answer to
+the baseline's; critic fallbacks count as errors. `--diffs` writes unified diffs per record.
+"""
+import argparse
+import asyncio
+import difflib
+import json
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+import yaml
+
+from config import AppConfig, load_config
+from critic import CriticService
+from critic_strategies.base import collect_usage
+from pools import EndpointPools
+from recorder import RecordStore
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def parse_spec(spec: str) -> Tuple[str, Dict]:
+    name, _, raw = spec.partition(":")
+    params = {}
+    for pair in filter(None, raw.split(",")):
+        key, _, value = pair.partition("=")
+        params[key.strip()] = yaml.safe_load(value)
+    return name, params
+
+def build_critic(config: AppConfig, spec: str, pools: EndpointPools) -> CriticService:
+    name, params = parse_spec(spec)
+    critic_cfg = config.critic.model_copy(update={
+        "strategy": name,
+        "strategy_params": {**config.critic.strategy_params, **params},
+    })
+    return CriticService(config.model_copy(update={"critic": critic_cfg}), pools)
+
+async def run_critic(critic: CriticService, candidates: List[dict], context: Optional[str]) -> dict:
+    """
+    Run the critic the way the gateway does, through an incremental session when
+    the strategy has one (tournament), so compaction is skipped exactly as live.
+    """
+    ready = asyncio.get_running_loop().create_future()
+    ready.set_result(context)
+    session = critic.open_session(ready, len(candidates))
+    if session:
+        for candidate in candidates:
+            session.add(candidate)
+        session.freeze()
+    return await critic.run_critic(candidates, context, session)
+
+async def run_one(critic: CriticService, record: dict, sem: asyncio.Semaphore) -> dict:
+    async with sem:
+        calls = collect_usage()  # Every critic call, e.g. all tournament rounds
+        started = time.monotonic()
+        try:
+            resp = await run_critic(critic, record["candidates"], record.get("context"))
+        except Exception as exc:
+            return {"error": str(exc) or type(exc).__name__}
+        elapsed = time.monotonic() - started
+    if not resp.get("id"):
+        # Critic fallbacks echo a candidate and carry no id (see _complete): a failure, not an answer
+        return {"error": "critic fallback"}
+    content = (resp.get("choices") or [{}])[0].get("message", {}).get("content") or ""
+    return {
+        "latency": elapsed,
+        # Critic output only: 0 when the strategy answered without a critic call
+        "output_tokens": sum(usage.get("completion_tokens") or 0 for usage in calls),
+        "content": content,
+    }
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded fan-outs through critic strategies")
+    parser.add_argument("store", help="SQLite file written by the gateway (record.path)")
+    parser.add_argument("--strategy", action="append", required=True, help="name[:key=value,...]; repeatable")
+    parser.add_argument("--config", default=None, help="Config file (default: $MOM_CONFIG or config.yaml)")
+    parser.add_argument("--limit", type=int, default=None, help="Replay at most this many records")
+    parser.add_argument("--concurrency", type=int, default=4, help="Critic calls in flight")
+    parser.add_argument("--diffs", default=None, help="Write per-record outputs and diffs as JSONL")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if not config.critic:
+        print("Config has no critic section", file=sys.stderr)
+        return 1
+    store = RecordStore(args.store)
+    records = list(store.read(limit=args.limit))
+    store.close()
+    if not records:
+        print("No records to replay", file=sys.stderr)
+        return 1
+
+    pools = EndpointPools(config)
+    sem = asyncio.Semaphore(args.concurrency)
+    try:
+        critics = {spec: build_critic(config, spec, pools) for spec in args.strategy}
+        # All strategies share one concurrency limit and run side by side
+        outcomes = await asyncio.gather(*(
+            asyncio.gather(*(run_one(critic, r, sem) for r in records)) for critic in critics.values()
+        ))
+        results: Dict[str, List[dict]] = dict(zip(critics, outcomes))
+    finally:
+        await pools.aclose()
+
+    baseline = args.strategy[0]
+    report = {"records": len(records), "baseline": baseline, "strategies": {}}
+    for spec, outcomes in results.items():
+        ok = [o for o in outcomes if "error" not in o]
+        similarity = [
+            difflib.SequenceMatcher(None, base["content"], o["content"]).ratio()
+            for base, o in zip(results[baseline], outcomes)
+            if "error" not in base and "error" not in o
+        ]
+        latencies = [o["latency"] for o in ok]
+        tokens = [o["output_tokens"] for o in ok]
+        report["strategies"][spec] = {
+            "errors": len(outcomes) - len(ok),
+            "latency_p50": percentile(latencies, 0.50),
+            "latency_p95": percentile(latencies, 0.95),
+            "output_tokens_mean": sum(tokens) / len(tokens) if tokens else None,
+            "output_tokens_total": sum(tokens),
+            "similarity_to_baseline": sum(similarity) / len(similarity) if similarity else None,
+        }
+
+    if args.diffs:
+        with open(args.diffs, "w") as fh:
+            for i, record in enumerate(records):
+                base = results[baseline][i].get("content", "")
+                entry = {"id": record["id"], "request_id": record["request_id"], "outputs": {}, "diffs": {}}
+                for spec in args.strategy:
+                    outcome = results[spec][i]
+                    entry["outputs"][spec] = outcome.get("content", outcome.get("error"))
+                    if spec != baseline:
+                        entry["diffs"][spec] = "".join(difflib.unified_diff(
+                            base.splitlines(keepends=True),
+                            outcome.get("content", "").splitlines(keepends=True),
+                            fromfile=baseline, tofile=spec,
+                        ))
+                fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
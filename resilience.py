@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Deque, Dict, Iterable, Optional, Tuple
+import httpx
+from config import BreakerConfig, RetryConfig
+from shared_state import SharedStore
+from spans import span
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class CircuitBreaker:
+    """Closed -> open on high error rate, half-open probe after a cool-down"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, cfg: BreakerConfig):
+        self.cfg = cfg
+        self.state = self.CLOSED
+        self.outcomes: Deque[bool] = deque(maxlen=cfg.window)
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.cfg.open_seconds:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_started = None
+        if self.state == self.HALF_OPEN:
+            # One probe at a time; a probe that never reported is retried after cool-down
+            if self.probe_started is not None and now - self.probe_started < self.cfg.open_seconds:
+                return False
+            self.probe_started = now
+        return True
+
+    def record(self, ok: bool) -> None:
+        if self.state == self.HALF_OPEN:
+            if ok:
+                logger.info("Circuit closed after successful probe")
+                self.state = self.CLOSED
+                self.outcomes.clear()
+            else:
+                self._open()
+            return
+        self.outcomes.append(ok)
+        failures = self.outcomes.count(False)
+        if (
+            self.state == self.CLOSED
+            and len(self.outcomes) >= self.cfg.min_requests
+            and failures / len(self.outcomes) >= self.cfg.failure_rate
+        ):
+            self._open()
+
+    def reopens_in(self) -> float:
+        """Seconds until this circuit will admit a call again (0 if it does now)"""
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            return max(0.0, self.opened_at + self.cfg.open_seconds - now)
+        if self.state == self.HALF_OPEN and self.probe_started is not None:
+            return max(0.0, self.probe_started + self.cfg.open_seconds - now)
+        return 0.0
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probe_started = None
+
+class BreakerRegistry:
+    """
+    Per-(endpoint, model) circuit breakers created on first use. With a shared
+    store, a circuit opened by one worker is skipped by all of them.
+    """
+
+    def __init__(self, cfg: BreakerConfig, store: Optional[SharedStore] = None):
+        self.cfg = cfg
+        self.store = store
+        self.breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    def get(self, endpoint: str, model: str) -> CircuitBreaker:
+        breaker = self.breakers.get((endpoint, model))
+        if breaker is None:
+            breaker = self.breakers[(endpoint, model)] = CircuitBreaker(self.cfg)
+        return breaker
+
+    def allow(self, endpoint: str, model: str) -> bool:
+        if not self.cfg.enabled:
+            return True
+        if self.store and self.store.open_until(f"{endpoint}|{model}") > time.time():
+            return False
+        return self.get(endpoint, model).allow()
+
+    def retry_after(self, targets: Iterable[Tuple[str, str]]) -> int:
+        """Whole seconds until the first of these (endpoint, model) circuits admits calls"""
+        waits = [0.0]
+        if self.cfg.enabled:
+            now = time.time()
+            waits = [
+                max(
+                    self.get(endpoint, model).reopens_in(),
+                    self.store.open_until(f"{endpoint}|{model}") - now if self.store else 0.0,
+                )
+                for endpoint, model in targets
+            ] or waits
+        return max(1, math.ceil(min(waits)))
+
+    def record(self, endpoint: str, model: str, ok: bool) -> None:
+        if self.cfg.enabled:
+            breaker = self.get(endpoint, model)
+            before = breaker.state
+            breaker.record(ok)
+            if breaker.state != before:
+                logger.warning("Circuit for %s@%s is now %s", model, endpoint, breaker.state)
+                if self.store:
+                    opened = breaker.state == CircuitBreaker.OPEN
+                    until = time.time() + self.cfg.open_seconds if opened else 0.0
+                    self.store.set_open_until(f"{endpoint}|{model}", until)
+
+class RetryBudget:
+    """
+    Gateway-wide retry allowance: every request deposits `ratio` tokens, every
+    retry withdraws one, with a small per-second floor so isolated failures retry.
+    """
+
+    def __init__(self, cfg: RetryConfig):
+        self.ratio = cfg.budget_ratio
+        self.min_per_second = cfg.budget_min_per_second
+        self.capacity = max(1.0, cfg.budget_max_tokens)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def record_request(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_retry(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.min_per_second)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+def retry_after_seconds(resp: httpx.Response) -> Optional[float]:
+    """Parse Retry-After as delta-seconds or HTTP date"""
+    value = resp.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+async def send_with_retries(
+    send: Callable[[], Awaitable[httpx.Response]],
+    cfg: RetryConfig,
+    budget: Optional[RetryBudget],
+    label: str = "",
+) -> httpx.Response:
+    """
+    Call `send` and retry transport errors, 429 and 5xx responses with
+    exponential backoff, honoring Retry-After while the budget allows.
+    """
+    if budget:
+        budget.record_request()
+    attempt = 0
+    while True:
+        attempt += 1
+        last = attempt >= cfg.attempts
+        try:
+            with span("attempt", target=label, attempt=attempt) as attempt_span:
+                resp = await send()
+                if attempt_span:
+                    attempt_span["attrs"]["status"] = resp.status_code
+        except httpx.TransportError as exc:
+            if last or not (budget is None or budget.try_retry()):
+                raise
+            delay = _backoff(cfg, attempt)
+            logger.info("Retrying %s in %.1fs after %s", label, delay, exc)
+        else:
+            if resp.status_code not in RETRYABLE_STATUS or last:
+                return resp
+            delay = retry_after_seconds(resp)
+            if delay is not None and delay > cfg.max_retry_after:
+                return resp  # Provider asks for a longer pause than we can wait
+            if budget is not None and not budget.try_retry():
+                logger.warning("Retry budget exhausted, not retrying %s", label)
+                return resp
+            delay = _backoff(cfg, attempt) if delay is None else delay
+            logger.info("Retrying %s in %.1fs after HTTP %s", label, delay, resp.status_code)
+            await resp.aclose()
+        with span("backoff", target=label, attempt=attempt):
+            await asyncio.sleep(delay)
+
+def _backoff(cfg: RetryConfig, attempt: int) -> float:
+    delay = min(cfg.backoff_max, cfg.backoff_base * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)  # Jitter
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a SQLite file for concurrent use by several worker processes"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+class SharedStore:
+    """Rate-limit buckets, circuit trips and config reloads shared by all workers on one host"""
+
+    OPEN_REFRESH = 1.0  # Seconds a breaker lookup is reused before re-reading
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        # Breakers use their own connection and lock, never contending with bucket transactions
+        self._breaker_lock = threading.Lock()
+        self._breaker_db = connect(path)
+        self._open: Dict[str, Tuple[float, float]] = {}  # key -> (checked_at, open_until)
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS breakers "
+                "(key TEXT PRIMARY KEY, open_until REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reloads (id INTEGER PRIMARY KEY CHECK (id = 0), seq INTEGER NOT NULL)"
+            )
+
+    def take_token(self, key: str, rate: float, capacity: float) -> float:
+        """Consume one token, returning 0, or the seconds to wait before one is available"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._db.execute(
+                    "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+                self._db.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return wait
+
+    def reload_seq(self) -> int:
+        """Number of config reloads requested so far by any worker (blocking; use to_thread)"""
+        with self._lock:
+            row = self._db.execute("SELECT seq FROM reloads WHERE id = 0").fetchone()
+        return row[0] if row else 0
+
+    def bump_reload(self) -> int:
+        """Ask every worker to reload its config, returning the new sequence number"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO reloads (id, seq) VALUES (0, 1) "
+                "ON CONFLICT(id) DO UPDATE SET seq = seq + 1"
+            )
+            return self._db.execute("SELECT seq FROM reloads WHERE id = 0").fetchone()[0]
+
+    def open_until(self, key: str) -> float:
+        """
+        Wall-clock time until which some worker has opened this circuit. Served
+        from memory; a stale entry triggers a background re-read, so the event
+        loop never waits on SQLite.
+        """
+        now = time.time()
+        cached = self._open.get(key)
+        if (not cached or now - cached[0] >= self.OPEN_REFRESH) and key not in self._refreshing:
+            self._refreshing.add(key)
+            self._spawn(self._refresh(key))
+        return cached[1] if cached else 0.0
+
+    def set_open_until(self, key: str, until: float) -> None:
+        self._open[key] = (time.time(), until)
+        self._spawn(asyncio.to_thread(self._write_open, key, until))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key: str) -> None:
+        try:
+            until = await asyncio.to_thread(self._read_open, key)
+            self._open[key] = (time.time(), until)
+        except sqlite3.Error as exc:
+            logger.warning("Shared breaker read failed: %s", exc)
+        finally:
+            self._refreshing.discard(key)
+
+    def _read_open(self, key: str) -> float:
+        with self._breaker_lock:
+            row = self._breaker_db.execute(
+                "SELECT open_until FROM breakers WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else 0.0
+
+    def _write_open(self, key: str, until: float) -> None:
+        try:
+            with self._breaker_lock:
+                self._breaker_db.execute(
+                    "INSERT OR REPLACE INTO breakers (key, open_until) VALUES (?, ?)", (key, until)
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Shared breaker write failed: %s", exc)
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        with self._lock:
+            self._db.close()
+        with self._breaker_lock:
+            self._breaker_db.close()
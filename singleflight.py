@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class Broadcast:
+    """Replayable buffer of SSE chunks shared by every streaming subscriber"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.pump: Optional[asyncio.Task] = None
+        self.source: Optional[Callable[[], AsyncIterator[str]]] = None
+        self.subscribers = 0
+        self._cond = asyncio.Condition()
+
+    async def publish(self, chunk: str) -> None:
+        async with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    async def close(self, error: Optional[BaseException] = None) -> None:
+        async with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        sent = 0
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: len(self.chunks) > sent or self.done)
+                batch = self.chunks[sent:]
+                finished = self.done
+            for chunk in batch:
+                yield chunk
+            sent += len(batch)
+            if finished and sent == len(self.chunks):
+                if self.error:
+                    raise self.error
+                return
+
+class SingleFlight:
+    """Coalesce identical in-flight requests onto one fan-out and critic run"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, Broadcast] = {}
+        self._pumps: Set[asyncio.Task] = set()
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            logger.info("Joining in-flight request %s", key[:12])
+        # Shield so one caller going away does not cancel the shared run; the last one does
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    logger.info("All callers left, cancelling shared request %s", key[:12])
+                    task.cancel()
+
+    def stream(self, key: str, gen_factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = Broadcast()
+            broadcast.source = gen_factory
+            self._streams[key] = broadcast
+        else:
+            logger.info("Joining in-flight stream %s", key[:12])
+        return self._subscribe(key, broadcast)
+
+    async def _subscribe(self, key: str, broadcast: Broadcast) -> AsyncIterator[str]:
+        broadcast.subscribers += 1
+        if broadcast.pump is None:
+            # Started on first subscribe so a response that is never sent leaves nothing running
+            pump = asyncio.create_task(self._pump(key, broadcast, broadcast.source()))
+            broadcast.pump = pump
+            self._pumps.add(pump)
+            pump.add_done_callback(self._pumps.discard)
+        try:
+            async for chunk in broadcast.subscribe():
+                yield chunk
+        finally:
+            broadcast.subscribers -= 1
+            if not broadcast.subscribers and not broadcast.done:
+                logger.info("All subscribers left, cancelling shared stream %s", key[:12])
+                broadcast.pump.cancel()
+
+    async def _pump(self, key: str, broadcast: Broadcast, source: AsyncIterator[str]) -> None:
+        error = None
+        try:
+            async for chunk in source:
+                await broadcast.publish(chunk)
+        except Exception as exc:
+            logger.exception("Shared stream failed: %s", exc)
+            error = exc
+        finally:
+            # New identical requests after this point start a fresh run
+            self._streams.pop(key, None)
+            await broadcast.close(error)
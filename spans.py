@@ -0,0 +1,101 @@
+import contextvars
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Spans of the current request; None when span collection is off
+_trace_ctx: contextvars.ContextVar[Optional["SpanTrace"]] = contextvars.ContextVar("span_trace", default=None)
+_parent_ctx: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span_parent", default=None)
+
+# Spans summarized in Server-Timing, with the attribute used as description
+SUMMARY = {
+    "context": None,
+    "fanout": None,
+    "upstream": "model",
+    "critic_ttfb": None,
+    "critic": None,
+    "request": None,
+}
+
+class SpanTrace:
+    """Spans recorded for one request, keyed by its request id"""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.root_id = uuid.uuid4().hex[:16]  # The "request" span, parent of top-level stages
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(
+        self,
+        name: str,
+        start: float,
+        duration: float,
+        parent: Optional[str] = None,
+        span_id: Optional[str] = None,
+        **attrs
+    ) -> dict:
+        """Record a span measured by the caller (start is wall-clock time)"""
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": span_id or uuid.uuid4().hex[:16],
+            "parent_id": parent,
+            "name": name,
+            "start": start,
+            "duration": duration,
+            "attrs": attrs,
+        }
+        self.spans.append(record)
+        return record
+
+    def server_timing(self) -> str:
+        """Server-Timing header value summarizing the main stages"""
+        entries = []
+        for record in self.spans:
+            if record["name"] not in SUMMARY:
+                continue
+            entry = f"{record['name']};dur={record['duration'] * 1000:.1f}"
+            desc_attr = SUMMARY[record["name"]]
+            if desc_attr and record["attrs"].get(desc_attr):
+                desc = str(record["attrs"][desc_attr]).replace('"', "'")
+                entry += f';desc="{desc}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+    def export(self) -> dict:
+        return {"trace_id": self.trace_id, "spans": self.spans}
+
+def start_trace(trace_id: str) -> SpanTrace:
+    """Begin collecting spans for the current request (inherited by its tasks)"""
+    trace = SpanTrace(trace_id)
+    _trace_ctx.set(trace)
+    _parent_ctx.set(trace.root_id)
+    return trace
+
+def record_span(name: str, start: float, duration: float, **attrs) -> None:
+    """Add a span measured elsewhere under the current parent, if tracing"""
+    trace = _trace_ctx.get()
+    if trace:
+        trace.add(name, start, duration, _parent_ctx.get(), **attrs)
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[dict]]:
+    """
+    Time a block as a child of the current span. Not for use across `yield`
+    in async generators, which would leak the parent into the consumer.
+    """
+    trace = _trace_ctx.get()
+    if trace is None:
+        yield None
+        return
+    start, started = time.time(), time.monotonic()
+    record = trace.add(name, start, 0.0, _parent_ctx.get(), **attrs)
+    token = _parent_ctx.set(record["span_id"])
+    try:
+        yield record
+    except BaseException as exc:
+        record["attrs"]["error"] = type(exc).__name__
+        raise
+    finally:
+        record["duration"] = time.monotonic() - started
+        _parent_ctx.reset(token)
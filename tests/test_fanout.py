@@ -0,0 +1,84 @@
+import asyncio
+from fanout import release_stragglers, wait_for_quorum
+
+async def _answer(delay: float, body="ok"):
+    await asyncio.sleep(delay)
+    return body
+
+async def _fail(delay: float):
+    await asyncio.sleep(delay)
+    return None
+
+def test_quorum_stops_after_k_of_n_successes():
+    async def scenario():
+        tasks = [asyncio.create_task(_answer(d)) for d in (0.01, 0.02, 5, 5)]
+        pending = await wait_for_quorum(tasks, min_candidates=2)
+        release_stragglers(pending, "cancel")
+        await asyncio.gather(*pending, return_exceptions=True)
+        return tasks, pending
+
+    tasks, pending = asyncio.run(scenario())
+    assert pending == set(tasks[2:])
+    assert all(t.cancelled() for t in tasks[2:])
+
+def test_failures_do_not_count_toward_quorum():
+    async def scenario():
+        tasks = [
+            asyncio.create_task(_fail(0.01)),
+            asyncio.create_task(_fail(0.01)),
+            asyncio.create_task(_answer(0.05)),
+            asyncio.create_task(_answer(0.06)),
+        ]
+        pending = await wait_for_quorum(tasks, min_candidates=2)
+        return tasks, pending
+
+    tasks, pending = asyncio.run(scenario())
+    assert not pending
+    assert [t.result() for t in tasks] == [None, None, "ok", "ok"]
+
+def test_soft_deadline_without_successes_waits_for_the_first():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = [
+            asyncio.create_task(_fail(0.01)),
+            asyncio.create_task(_answer(0.1)),
+            asyncio.create_task(_answer(5)),
+        ]
+        pending = await wait_for_quorum(tasks, soft_deadline=0.02)
+        elapsed = loop.time() - started
+        release_stragglers(pending, "cancel")
+        await asyncio.gather(*pending, return_exceptions=True)
+        return tasks, pending, elapsed
+
+    tasks, pending, elapsed = asyncio.run(scenario())
+    assert tasks[1].done() and tasks[1].result() == "ok"
+    assert pending == {tasks[2]}
+    assert 0.1 <= elapsed < 1
+
+def test_soft_deadline_stops_with_what_arrived():
+    async def scenario():
+        tasks = [asyncio.create_task(_answer(d)) for d in (0.01, 5)]
+        pending = await wait_for_quorum(tasks, soft_deadline=0.05)
+        release_stragglers(pending, "cancel")
+        await asyncio.gather(*pending, return_exceptions=True)
+        return tasks, pending
+
+    tasks, pending = asyncio.run(scenario())
+    assert pending == {tasks[1]}
+
+def test_background_stragglers_stay_referenced_until_done():
+    async def scenario():
+        owner = set()
+        tasks = [asyncio.create_task(_answer(d)) for d in (0.01, 0.05)]
+        pending = await wait_for_quorum(tasks, min_candidates=1)
+        release_stragglers(pending, "background", owner)
+        held = set(owner)
+        await asyncio.gather(*pending)
+        await asyncio.sleep(0)  # Let done callbacks run
+        return tasks, held, owner
+
+    tasks, held, owner = asyncio.run(scenario())
+    assert held == {tasks[1]}
+    assert not tasks[1].cancelled()
+    assert not owner
@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from config import AdmissionConfig
+from limits import AdmissionController, Overloaded
+
+def test_burst_on_idle_controller_respects_inflight_and_queue():
+    async def burst():
+        admission = AdmissionController(AdmissionConfig(max_inflight=1, max_queue=1, max_queue_wait=30))
+        tasks = [asyncio.create_task(admission.acquire()) for _ in range(10)]
+        await asyncio.sleep(0.05)
+        shed = [t for t in tasks if t.done() and isinstance(t.exception(), Overloaded)]
+        state = (len(shed), admission.inflight, admission.waiting)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return state
+
+    # One request runs, one waits in the queue, the other eight are shed immediately
+    assert asyncio.run(burst()) == (8, 1, 1)
+
+def test_queued_request_gets_released_permit():
+    async def scenario():
+        admission = AdmissionController(AdmissionConfig(max_inflight=1, max_queue=1, max_queue_wait=1.0))
+        await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.waiting == 1
+        with pytest.raises(Overloaded):
+            await admission.acquire()
+        admission.release()
+        await waiter
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.inflight == 1
+    assert admission.waiting == 0
@@ -0,0 +1,108 @@
+import asyncio
+import httpx
+import pytest
+import resilience
+from config import BreakerConfig, RetryConfig
+from resilience import CircuitBreaker, RetryBudget, send_with_retries
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker(BreakerConfig(window=4, min_requests=4, failure_rate=0.5, open_seconds=30))
+
+def test_breaker_opens_on_error_rate_and_waits_for_cooldown(clock):
+    breaker = _breaker()
+    for ok in (True, False, True):
+        breaker.record(ok)
+    assert breaker.state == CircuitBreaker.CLOSED  # Below min_requests
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.now += 10
+    assert breaker.reopens_in() == 20
+
+def test_half_open_admits_a_single_probe(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False)
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # The probe is still out
+    clock.now += 30
+    assert breaker.allow()  # A probe that never reported is retried after cool-down
+
+def test_successful_probe_closes_and_failed_probe_reopens(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED  # History was cleared on close
+
+def _responses(*statuses, headers=None):
+    calls = []
+
+    async def send():
+        calls.append(asyncio.get_running_loop().time())
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        return httpx.Response(status, headers=headers if status != 200 else None)
+
+    return send, calls
+
+def _sleeps(monkeypatch):
+    slept = []
+
+    async def sleep(delay):
+        slept.append(delay)
+
+    monkeypatch.setattr(resilience.asyncio, "sleep", sleep)
+    return slept
+
+def test_retries_honor_retry_after(monkeypatch):
+    slept = _sleeps(monkeypatch)
+    send, calls = _responses(429, 200, headers={"Retry-After": "2"})
+    resp = asyncio.run(send_with_retries(send, RetryConfig(attempts=3), None))
+    assert resp.status_code == 200
+    assert len(calls) == 2
+    assert slept == [2.0]
+
+def test_retry_after_beyond_limit_is_not_waited_for(monkeypatch):
+    slept = _sleeps(monkeypatch)
+    send, calls = _responses(503, headers={"Retry-After": "120"})
+    resp = asyncio.run(send_with_retries(send, RetryConfig(attempts=3, max_retry_after=30), None))
+    assert resp.status_code == 503
+    assert len(calls) == 1
+    assert slept == []
+
+def test_exhausted_budget_stops_retries(monkeypatch, clock):
+    slept = _sleeps(monkeypatch)
+    cfg = RetryConfig(attempts=5, budget_ratio=0.0, budget_min_per_second=0.0, budget_max_tokens=1)
+    budget = RetryBudget(cfg)
+    send, calls = _responses(503)
+    resp = asyncio.run(send_with_retries(send, cfg, budget))
+    assert resp.status_code == 503
+    assert len(calls) == 2  # One retry from the single budget token
+    assert len(slept) == 1
+    assert not budget.try_retry()
@@ -0,0 +1,48 @@
+import asyncio
+from config import AppConfig
+from critic import CriticService
+from pools import EndpointPools
+
+def _candidate(content: str) -> dict:
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+def _critic(ranking: str):
+    config = AppConfig(
+        endpoints=[{"name": "mock", "base_url": "http://mock", "api_key": "x"}],
+        models=[],
+        critic={
+            "strategy": "select", "endpoint": "mock", "model": "critic",
+            "max_candidate_tokens": 5,
+        },
+    )
+    critic = CriticService(config, EndpointPools(config))
+    prompts = []
+
+    async def call_endpoint(payload):
+        prompts.append(payload["messages"][1]["content"])
+        return {"choices": [{"message": {"content": ranking}}], "usage": {"completion_tokens": 1}}
+
+    critic.strategy._call_endpoint = call_endpoint
+    return critic, prompts
+
+def test_select_ranks_trimmed_candidates_but_returns_the_full_winner():
+    candidates = [_candidate("A" * 40), _candidate("B" * 40)]
+    critic, prompts = _critic("2")
+
+    resp = asyncio.run(critic.run_critic(candidates))
+
+    assert resp["choices"][0]["message"]["content"] == "B" * 40
+    assert "B" * 40 not in prompts[0] and "[... truncated ...]" in prompts[0]
+
+def test_select_stream_returns_the_full_winner():
+    candidates = [_candidate("A" * 40), _candidate("B" * 40)]
+    critic, _ = _critic("2")
+
+    async def collect():
+        return [chunk async for chunk in critic.run_critic_stream(candidates)]
+
+    content = "".join(
+        (chunk["choices"][0]["delta"].get("content") or "")
+        for chunk in asyncio.run(collect()) if chunk["choices"]
+    )
+    assert content == "B" * 40
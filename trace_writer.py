@@ -0,0 +1,192 @@
+import asyncio
+import gzip
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import codec
+from config import TraceConfig
+
+logger = logging.getLogger(__name__)
+
+def build_trace(
+    request_id: str,
+    messages: List[Dict[str, Any]],
+    tasks_info: List[Dict[str, Any]],
+    context: Optional[str],
+    critic: Dict[str, Any],
+    timings: Dict[str, float],
+) -> dict:
+    """
+    One JSONL record per request:
+    - initial chat history
+    - every upstream model response with status, timings and usage
+    - critic context
+    - critic answer, reasoning, usage and timings
+    """
+    candidates = []
+    for info in tasks_info:
+        body = info.get("body") or {}
+        message = (body.get("choices") or [{}])[0].get("message") or {}
+        candidates.append({
+            "endpoint": info["endpoint"],
+            "model": info["model"],
+            "status": info.get("status"),
+            "ttfb": info.get("ttfb"),
+            "elapsed": info.get("elapsed"),
+            "params": {k: v for k, v in info["payload"].items() if k != "messages"},
+            "content": message.get("content"),
+            "reasoning": message.get("reasoning"),
+            "usage": body.get("usage"),
+        })
+    return {
+        "request_id": request_id,
+        "timestamp": time.time(),
+        "messages": messages,
+        "candidates": candidates,
+        "context": context,
+        "critic": critic,
+        "timings": timings,
+    }
+
+class BackgroundWriter(ABC):
+    """
+    Queue records without blocking the request and hand them to `_write_batch`
+    in a worker thread, in batches of up to `batch_size` collected for at most
+    `flush_interval` seconds. Records beyond the queue's capacity are dropped.
+    """
+
+    kind = "records"  # For log messages
+
+    def __init__(self, queue_size: int, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, record: dict) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning("Queue full, %s %s dropped so far", self.dropped, self.kind)
+
+    async def aclose(self) -> None:
+        if self._task:
+            await self._queue.put(None)
+            await self._task
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is None:
+                break
+            batch = [record]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    record = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        record = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as exc:  # never break main flow
+                logger.exception("Failed to write %s: %s", self.kind, exc)
+
+    @abstractmethod
+    def _write_batch(self, batch: List[dict]) -> None:
+        """Persist one batch; runs in a worker thread"""
+        pass
+
+class TraceWriter(BackgroundWriter):
+    """
+    Background writer for per-request debug traces.
+
+    Records are queued without blocking the request, written in batches as
+    gzip-compressed JSONL (one gzip member per batch) and rotated by size and age.
+    """
+
+    kind = "traces"
+
+    def __init__(
+        self,
+        directory: Path,
+        cfg: TraceConfig,
+        sample_rate: Optional[float] = None,
+        prefix: str = "traces",
+    ):
+        super().__init__(cfg.queue_size, cfg.batch_size, cfg.flush_interval)
+        self.directory = directory
+        self.prefix = prefix
+        self.cfg = cfg
+        self.sample_rate = cfg.sample_rate if sample_rate is None else sample_rate
+        self._path: Optional[Path] = None
+        self._opened_at = 0.0
+
+    def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        super().start()
+
+    def sampled(self) -> bool:
+        """Decide at request start whether this request is traced"""
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def _write_batch(self, batch: List[dict]) -> None:
+        self._maybe_rotate()
+        data = b"".join(codec.dumpb(record) + b"\n" for record in batch)
+        with open(self._path, "ab") as fh:
+            fh.write(gzip.compress(data))
+
+    def _maybe_rotate(self) -> None:
+        now = time.time()
+        if (
+            self._path is not None
+            and now - self._opened_at < self.cfg.max_age
+            and (not self._path.exists() or self._path.stat().st_size < self.cfg.max_bytes)
+        ):
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        # Workers share the directory: file names carry the writer's pid
+        own = f"{self.prefix}-{os.getpid()}-"
+        self._path = self.directory / f"{own}{stamp}-{int(now * 1000) % 1000:03d}.jsonl.gz"
+        self._opened_at = now
+        if self.cfg.max_files:
+            self._prune(own, now)
+
+    def _prune(self, own: str, now: float) -> None:
+        """
+        Keep the newest max_files across every pid, so files left by restarted or
+        recycled workers count too; other workers' files modified within max_age
+        may still be open and are left alone.
+        """
+        files = []
+        for path in self.directory.glob(f"{self.prefix}-*.jsonl.gz"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:  # Pruned by another worker meanwhile
+                continue
+        files.sort()
+        for mtime, old in files[:max(0, len(files) - self.cfg.max_files + 1)]:
+            if not old.name.startswith(own) and now - mtime < self.cfg.max_age:
+                continue
+            old.unlink(missing_ok=True)
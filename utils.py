@@ -1,14 +1,38 @@
 import time
 import uuid
 import logging
-from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Optional, AsyncGenerator
 import contextvars
+import httpx
+import codec
 
 logger = logging.getLogger(__name__)
 
 # Context variable for request ID propagation
 request_id_ctx = contextvars.ContextVar("request_id", default="-")
+_logging_configured = False
+
+def configure_logging(level: str = "INFO") -> None:
+    """Root logging with request ids; safe to call once per process from main or a worker"""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    logging.basicConfig(
+        level=getattr(logging, level.upper(), logging.INFO),
+        format="%(asctime)s [%(levelname)s] [req:%(request_id)s] %(name)s: %(message)s"
+    )
+
+    # Override global LogRecord factory to inject request_id
+    old_factory = logging.getLogRecordFactory()
+
+    def record_factory(*args, **kwargs):
+        record = old_factory(*args, **kwargs)
+        # Default to "-" if contextvar is unset (safe for startup/background)
+        record.request_id = request_id_ctx.get("-")
+        return record
+
+    logging.setLogRecordFactory(record_factory)
 
 def format_response(message: dict, usage: Optional[dict] = None) -> dict:
     """Standardized OpenAI response format"""
@@ -25,65 +49,38 @@ def format_response(message: dict, usage: Optional[dict] = None) -> dict:
         "usage": {k: v for k, v in (usage or {}).items() if isinstance(v, int)} if usage else None
     }
 
-def write_debug_trace(
-    messages: List[Dict[str, Any]],
-    tasks_info: List[Dict[str, Any]],
-    context: Optional[str],
-    final_resp: dict,
-    debug_dir: Path,
-    request_id: str,
-    critic_thinking: Optional[str] = None
-):
-    """
-    Write a human-readable text file containing:
-    - initial chat history
-    - every upstream model response
-    - critic context
-    - critic thinking (reasoning tokens)
-    - final critic answer
-    """
-    try:
-        lines: list[str] = []
-        lines.append("=== CHAT HISTORY ===")
-        for m in messages:
-            lines.append(f"{m.get('role', '').upper()}: {m.get('content', '')}")
-        lines.append("")
-
-        lines.append("=== CANDIDATE RESPONSES ===")
-        for info in tasks_info:
-            lines.append(
-                f"--- from model {info['model']} (endpoint {info['endpoint']}) "
-                f"status={info.get('status', 'n/a')} ---"
-            )
-            body = info.get("body")
-            if isinstance(body, dict):
-                # try to show only main content
-                try:
-                    content = body["choices"][0]["message"]["content"]
-                except Exception:
-                    content = str(body)[:1000]
-            else:
-                content = str(body)[:1000]
-            lines.append(content)
-            lines.append("")
+async def iter_sse_json(resp: httpx.Response) -> AsyncGenerator[dict, None]:
+    """Parse an OpenAI-style SSE body into JSON chunks, stopping at [DONE]"""
+    async for line in resp.aiter_lines():
+        if line.startswith("data: "):
+            data = line[6:].strip()
+            if data == "[DONE]":
+                return
+            try:
+                parsed = codec.loads(data)
+            except codec.DecodeError:
+                logger.warning("Bad JSON chunk: %s", data)
+                continue
+            yield codec.SSEChunk(parsed, data) if isinstance(parsed, dict) else parsed
 
-        lines.append("=== CRITIC CONTEXT ===")
-        lines.append(context or "(none)")
-        lines.append("")
-
-        lines.append("=== CRITIC THINKING ===")
-        lines.append(critic_thinking or "(none)")
-        lines.append("")
-
-        lines.append("=== FINAL ANSWER ===")
-        final_content = (
-            final_resp.get("choices", [{}])[0]
-            .get("message", {})
-            .get("content", "")
-        )
-        lines.append(final_content)
-
-        fname = debug_dir / f"{int(time.time())}-{request_id}.txt"
-        fname.write_text("\n".join(lines), encoding="utf-8")
-    except Exception as exc:      # never break main flow
-        logger.exception("Failed to write debug trace: %s", exc)
+def completion_to_chunks(resp: dict) -> List[dict]:
+    """Split a complete chat response into SSE chunks for replay"""
+    message = resp["choices"][0].get("message", {})
+    base = {
+        "id": resp.get("id") or f"mix-{uuid.uuid4().hex}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": resp.get("model", "mixture-v1"),
+    }
+    chunks = []
+    if message.get("reasoning"):
+        chunks.append({**base, "choices": [{
+            "index": 0, "delta": {"role": "assistant", "reasoning": message["reasoning"]},
+            "finish_reason": None
+        }]})
+    chunks.append({**base, "choices": [{
+        "index": 0, "delta": {"role": "assistant", "content": message.get("content") or ""},
+        "finish_reason": None
+    }]})
+    chunks.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    return chunks